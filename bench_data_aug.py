@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Benchmark and golden-equivalence suite for DataAggregator.
+
+Builds synthetic house and casa_simulada `.dat` inputs of configurable size,
+runs every aggregation mode in a fresh process and reports wall time, output
+rows per second and peak RSS as JSON. The golden check runs the same modes
+through a frozen copy of the original row-by-row implementation and verifies
+that the current code writes byte-identical output files.
+"""
+
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, Namespace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import filecmp
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import tempfile
+import time
+import numpy as np
+
+from data_aug import APPLIANCE_INDICES, MODE_METHODS, OUTPUT_FILES, DataAggregator
+from utils.storage import load_array
+
+
+class ReferenceAggregator:
+    """
+    Frozen copy of the original DataAggregator, kept as the golden reference.
+    Do not optimize: its only purpose is to define the expected output.
+    """
+
+    def __init__(
+        self,
+        house_files: Dict[str, Path],
+        repeat_factor: Dict[str, int],
+        synthetic_files: Dict[str, Path],
+        output_files: Dict[str, Path],
+    ):
+        self._house_files = house_files
+        self._repeat_factor = repeat_factor
+        self._synthetic_files = synthetic_files
+        self._output_files = output_files
+        self._base_timestamp = datetime.strptime(
+            "2020-02-16 14:30:00", "%Y-%m-%d %H:%M:%S"
+        ).timestamp()
+
+    def _load(self, path: Path) -> np.ndarray:
+        with path.open("rb") as f:
+            return pickle.load(f)
+
+    def _save_aggregated(self, data: np.ndarray, appliance: str) -> None:
+        out_path = self._output_files[appliance]
+        os.makedirs(out_path.parent, exist_ok=True)
+        with out_path.open("wb") as f:
+            pickle.dump(data, f)
+
+    def _save_all_aggregate(self, data_map: Dict[str, np.ndarray]) -> None:
+        for appliance, arr in data_map.items():
+            self._save_aggregated(arr, appliance)
+
+    def _repeat_array(
+        self, repeat: int, values: np.ndarray, synthetic: bool = False
+    ) -> np.ndarray:
+        n_rows, _, _ = values.shape
+        cols = values.shape[1] if not synthetic else 2 + 1
+        expanded = np.empty((n_rows * repeat, cols, 2))
+        idx = 0
+        for _ in range(repeat):
+            for row in values:
+                self._base_timestamp += 60
+                if synthetic:
+                    expanded[idx] = [
+                        [self._base_timestamp, self._base_timestamp],
+                        row[1],
+                        row[2],
+                    ]
+                else:
+                    expanded[idx] = row
+                    expanded[idx][0] = [self._base_timestamp, self._base_timestamp]
+                idx += 1
+
+        return expanded
+
+    def _aggregate_data(self, repeats: Dict[str, int]) -> np.ndarray:
+        chunks: List[np.ndarray] = []
+        for name, path in self._house_files.items():
+            data = self._load(path)
+            augmented_arr = self._repeat_array(repeats.get(name, 1), data)
+            chunks.append(augmented_arr)
+
+        return np.concatenate(chunks, axis=0)
+
+    def _load_synthetic(self) -> Dict[str, np.ndarray]:
+        synth_data: Dict[str, np.ndarray] = {}
+        for appliance, path in self._synthetic_files.items():
+            data = self._load(path)
+            augmented_arr = self._repeat_array(1, data, synthetic=True)
+            synth_data[appliance] = augmented_arr
+
+        return synth_data
+
+    def _extract_channels(self, data: np.ndarray) -> Dict[str, np.ndarray]:
+        channels: Dict[str, np.ndarray] = {}
+        for appliance, idx in APPLIANCE_INDICES.items():
+            channels[appliance] = data[:, [0, 1, idx], :]
+        return channels
+
+    def _run(self, repeats: Dict[str, int], with_synthetic: bool) -> None:
+        channels = self._extract_channels(self._aggregate_data(repeats))
+        if with_synthetic:
+            synth = self._load_synthetic()
+            channels = {
+                ap: np.concatenate((channels[ap], synth[ap]), axis=0) for ap in channels
+            }
+        self._save_all_aggregate(channels)
+
+    def mode_default(self) -> None:
+        self._run({name: 1 for name in self._house_files}, with_synthetic=False)
+
+    def mode_random_assignment(self) -> None:
+        self._run(self._repeat_factor, with_synthetic=False)
+
+    def mode_synthetic_modelling(self) -> None:
+        self._run({name: 1 for name in self._house_files}, with_synthetic=True)
+
+    def mode_merged(self) -> None:
+        self._run(self._repeat_factor, with_synthetic=True)
+
+
+def make_inputs(
+    root: Path, n_houses: int, house_rows: int, synthetic_rows: int, seed: int
+) -> Dict[str, Dict[str, Path]]:
+    """
+    Write random house files (rows, 5, 2) and casa_simulada files (rows, 3, 2)
+    under `root`, with consecutive 60s timestamps like the real recordings.
+    """
+    rng = np.random.default_rng(seed)
+    houses: Dict[str, Path] = {}
+    for i in range(n_houses):
+        data = rng.gamma(1.0, 300.0, (house_rows, 5, 2))
+        data[:, 0, :] = 1.5e9 + 60.0 * np.arange(house_rows)[:, np.newaxis]
+        houses[f"casa_{i}"] = root / f"casa_{i}_train.dat"
+        with houses[f"casa_{i}"].open("wb") as f:
+            pickle.dump(data, f)
+    synthetic: Dict[str, Path] = {}
+    for appliance in APPLIANCE_INDICES:
+        data = rng.gamma(1.0, 300.0, (synthetic_rows, 3, 2))
+        data[:, 0, :] = 1.5e9 + 60.0 * np.arange(synthetic_rows)[:, np.newaxis]
+        synthetic[appliance] = root / f"train_{appliance}.dat"
+        with synthetic[appliance].open("wb") as f:
+            pickle.dump(data, f)
+    return {"houses": houses, "synthetic": synthetic}
+
+
+def _output_files(out_dir: Path) -> Dict[str, Path]:
+    return {ap: out_dir / path.name for ap, path in OUTPUT_FILES.items()}
+
+
+def _run_mode(
+    inputs: Dict[str, Dict[str, Path]],
+    repeat_factor: Dict[str, int],
+    mode: str,
+    out_dir: Path,
+    options: Dict,
+    queue: multiprocessing.Queue,
+) -> None:
+    aggregator = DataAggregator(
+        inputs["houses"],
+        repeat_factor,
+        output_files=_output_files(out_dir),
+        synthetic_files=inputs["synthetic"],
+        **options,
+    )
+    start = time.perf_counter()
+    getattr(aggregator, MODE_METHODS[mode])()
+    wall = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    rows = sum(len(load_array(path)) for path in aggregator.output_paths().values())
+    queue.put({"wall_s": wall, "output_rows": rows, "peak_rss_bytes": peak_rss})
+
+
+def benchmark_mode(
+    inputs: Dict[str, Dict[str, Path]],
+    repeat_factor: Dict[str, int],
+    mode: str,
+    out_dir: Path,
+    options: Dict,
+) -> Dict:
+    """
+    Run `mode` in a fresh process so that its peak RSS is measured in isolation.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_run_mode, args=(inputs, repeat_factor, mode, out_dir, options, queue)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Benchmark of {mode} failed with code {process.exitcode}.")
+    result = queue.get()
+    result["rows_per_s"] = result["output_rows"] / result["wall_s"]
+    return {"mode": mode, "options": options, **result}
+
+
+def _matches(expected: Path, actual: Path) -> bool:
+    """
+    Pickle outputs must be byte-identical. Other formats must hold the same
+    array, after rounding the power columns to float32 for compact files.
+    """
+    if expected.suffix == actual.suffix:
+        return filecmp.cmp(expected, actual, shallow=False)
+    reference = load_array(expected)
+    if actual.suffix == ".cdat":
+        reference = reference.copy()
+        reference[:, 1:] = reference[:, 1:].astype(np.float32)
+    result = np.asarray(load_array(actual))
+    return result.dtype == reference.dtype and np.array_equal(result, reference)
+
+
+def golden_check(
+    inputs: Dict[str, Dict[str, Path]],
+    repeat_factor: Dict[str, int],
+    mode: str,
+    work_dir: Path,
+    options: Dict,
+) -> Dict:
+    """
+    Compare the files written by the current code with the reference ones.
+    """
+    method = MODE_METHODS[mode]
+    expected_dir, actual_dir = work_dir / "expected", work_dir / "actual"
+    reference = ReferenceAggregator(
+        inputs["houses"],
+        repeat_factor,
+        inputs["synthetic"],
+        _output_files(expected_dir),
+    )
+    getattr(reference, method)()
+    aggregator = DataAggregator(
+        inputs["houses"],
+        repeat_factor,
+        output_files=_output_files(actual_dir),
+        synthetic_files=inputs["synthetic"],
+        **options,
+    )
+    getattr(aggregator, method)()
+    actual = aggregator.output_paths()
+    mismatches = [
+        appliance
+        for appliance, path in _output_files(expected_dir).items()
+        if not _matches(path, actual[appliance])
+    ]
+    return {
+        "mode": mode,
+        "options": options,
+        "identical": not mismatches,
+        "mismatches": mismatches,
+    }
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Benchmark DataAggregator modes and check them against the "
+        "reference implementation.",
+        formatter_class=ArgumentDefaultsHelpFormatter,
+        allow_abbrev=False,
+    )
+    parser.add_argument("--houses", type=int, default=3, help="Number of houses.")
+    parser.add_argument(
+        "--rows", type=int, default=43200, help="Rows per benchmark house."
+    )
+    parser.add_argument(
+        "--synthetic_rows",
+        type=int,
+        default=43200,
+        help="Rows per benchmark synthetic appliance file.",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Repeat factor of every house."
+    )
+    parser.add_argument(
+        "--golden_rows",
+        type=int,
+        default=2000,
+        help="Rows per house for the golden check (the reference is slow).",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(MODE_METHODS),
+        default=list(MODE_METHODS),
+        help="Modes to run.",
+    )
+    parser.add_argument(
+        "--options",
+        type=json.loads,
+        default={},
+        help="DataAggregator keyword arguments as JSON, e.g. '{\"workers\": 4}'.",
+    )
+    parser.add_argument(
+        "--skip_golden", action="store_true", help="Only run the benchmark."
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Input data seed.")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write the JSON report here."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_args()
+    report: Dict[str, List[Dict]] = {"benchmark": [], "golden": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        bench_dir = tmp_path / "bench"
+        bench_dir.mkdir()
+        inputs = make_inputs(
+            bench_dir, args.houses, args.rows, args.synthetic_rows, args.seed
+        )
+        repeat_factor = {name: args.repeat for name in inputs["houses"]}
+        for mode in args.modes:
+            print(f"Benchmarking {mode} ...")
+            report["benchmark"].append(
+                benchmark_mode(
+                    inputs, repeat_factor, mode, bench_dir / "out", args.options
+                )
+            )
+
+        if not args.skip_golden:
+            golden_dir = tmp_path / "golden"
+            golden_dir.mkdir()
+            inputs = make_inputs(
+                golden_dir, args.houses, args.golden_rows, args.golden_rows, args.seed
+            )
+            repeat_factor = {name: 2 + i for i, name in enumerate(inputs["houses"])}
+            # Modes added after the original implementation have no reference
+            golden_modes = [
+                mode
+                for mode in args.modes
+                if hasattr(ReferenceAggregator, MODE_METHODS[mode])
+            ]
+            for mode in golden_modes:
+                print(f"Checking {mode} against the reference ...")
+                report["golden"].append(
+                    golden_check(
+                        inputs, repeat_factor, mode, golden_dir / mode, args.options
+                    )
+                )
+
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(output)
+    print(output)
+
+    if not all(check["identical"] for check in report["golden"]):
+        raise SystemExit("Golden check failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ Modes:
   * synthetic_modelling: aggregates original data and adds synthetic appliance data.
   * random_assign: aggregates original data and repeats it by a predefined factor.
   * merged: applies both random_assign and synthetic_modelling.
+  * raa: recombines appliance activations of all houses into new house timelines.
+  * signal_transform: repeats the data with warping, scaling and noise on each copy.
+  * balanced: repeats only the windows where each appliance is active.
   * default: aggregates original data only.
 
 Evaluation splits:
@@ -14,15 +17,48 @@ Evaluation splits:
 """
 
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, Namespace
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import atexit
+import json
 import os
-import pickle
+import queue
 import numpy as np
 
-from utils.paths import HOME_PATH, DATA_PATH
+from utils.cache import OutputCache
+from utils.constants import (
+    ACTIVATION_THRESHOLD,
+    APPLIANCE_INDICES,
+    SAMPLE_SIZE,
+    TIME_STEP,
+)
+from utils.integrity import check_array, format_report, is_valid
+from utils.paths import HOME_PATH, DATA_PATH, CONF_PATH, ROOT_PATH
+from utils.profiling import (
+    PROFILER,
+    add_profile_arguments,
+    enable_profiling,
+    file_bytes,
+)
+from utils.resample import MAX_GAP_ROWS, resample
+from utils.shared import SharedArrayCache
+from utils.stats import ChannelStats, emit_config, load_stats, save_stats
+from utils.storage import (
+    CHUNK_CODECS,
+    STORAGE_FORMATS,
+    ChunkedWriter,
+    append_array,
+    format_path,
+    load_array,
+    save_array,
+)
+from utils.synthetic import generate_appliance
+from utils.transforms import iter_chunks, transform_chunks
+from utils.windows import WINDOW_CHANNELS, export_windows, load_window_config
 
 HOUSE_FILES_HARD = {
     "casa_igor": DATA_PATH.joinpath("./casa_igor/casa_igor_train.dat"),
@@ -74,30 +110,571 @@ OUTPUT_FILES = {
     ),
 }
 
-APPLIANCE_INDICES = {
-    "ar_condicionado": 2,
-    "chuveiro": 3,
-    "refrigerador": 4,
+# Objectives of the repeat factor planner: give every house the same number
+# of output rows, or the same number of active appliance rows
+PLAN_OBJECTIVES = ("rows", "balance")
+
+# Cached outputs of previous runs, keyed by their inputs and parameters
+CACHE_PATH = HOME_PATH.joinpath("./temp/data_aug_cache")
+
+# Code the cached outputs depend on, hashed into the cache key with the inputs
+CACHE_SOURCES = [Path(__file__)] + [
+    ROOT_PATH.joinpath(f"./utils/{module}.py")
+    for module in (
+        "constants",
+        "resample",
+        "stats",
+        "storage",
+        "synthetic",
+        "transforms",
+        "windows",
+    )
+]
+
+# Root of the per split/mode outputs written by --all
+ALL_MODES_PATH = HOME_PATH.joinpath("./temp/data_aug_all")
+
+# DataAggregator method run for each mode (named as in scripts/train.sh)
+MODE_METHODS = {
+    "no_args": "mode_default",
+    "synthetic_modelling": "mode_synthetic_modelling",
+    "random_assign": "mode_random_assignment",
+    "merged": "mode_merged",
+    "raa": "mode_random_activation",
+    "signal_transform": "mode_signal_transform",
+    "balanced": "mode_balanced",
 }
 
+# Modes that repeat houses by their factor and that add synthetic data
+RANDOM_ASSIGN_MODES = ("random_assign", "merged")
+SYNTHETIC_MODES = ("synthetic_modelling", "merged")
+
+# Modes whose outputs can be extended by incremental runs
+INCREMENTAL_MODES = ("no_args", "synthetic_modelling", "random_assign", "merged")
+
+# Written next to the outputs by incremental runs
+INCREMENTAL_STATE_FILE = "data_aug_state.json"
+
+# Per-channel statistics of the outputs, written next to them
+FEATURE_STATS_FILE = "feature_stats.json"
+
+# Smallest chunk written by the preallocated pipeline (one day of rows)
+MIN_CHUNK_ROWS = 1440
+
+# Rows per chunk streamed through the signal transforms (one week)
+TRANSFORM_CHUNK_ROWS = 7 * 1440
+
+# Parameters of utils.transforms.transform_chunks used by signal_transform
+DEFAULT_TRANSFORMS = {
+    "noise_std": 5.0,
+    "scale_spread": 0.1,
+    "warp_spread": 0.05,
+    "max_power": None,
+}
+
+# Parameters of the balanced mode: windows of `window_rows` rows with at least
+# `min_active_rows` active rows are oversampled up to `active_ratio` times the
+# number of idle windows
+DEFAULT_BALANCE = {
+    "active_ratio": 1.0,
+    "window_rows": SAMPLE_SIZE,
+    "min_active_rows": 5,
+}
+
+# Items held by each bounded queue of the pipelined execution
+PIPELINE_DEPTH = 2
+
+# Output formats that grow on disk chunk by chunk; others are written whole
+STREAM_FORMATS = ("npy", "chunked")
+
+# Bytes per output row that saving allocates on top of the output: pickle
+# serializes a full copy of it, compact a float32 copy of the power columns
+# plus timestamp temporaries
+SAVE_ROW_BYTES = {"pickle": 3 * 2 * 8, "npy": 0, "compact": 25, "chunked": 0}
+
+
+def _put(items: queue.Queue, item, consumer: Future) -> None:
+    """
+    Put `item` on the bounded queue `items`, raising the error of `consumer`
+    if it fails while the queue is full.
+    """
+    while True:
+        try:
+            items.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            if consumer.done():
+                consumer.result()
+                raise RuntimeError("Queue consumer exited early.")
+
+
+def timestamp_ramp(start_timestamp: float, first: int, count: int) -> np.ndarray:
+    """
+    Timestamps of rows `first` to `first + count` after `start_timestamp`.
+    """
+    steps = np.arange(first + 1, first + count + 1, dtype=np.float64)
+    return start_timestamp + TIME_STEP * steps
+
+
+def plan_timestamps(
+    row_counts: Dict[str, int], repeats: Dict[str, int], base_timestamp: float
+) -> Dict[str, float]:
+    """
+    Timestamp preceding the first row of each house when the houses are
+    expanded one after another, in `row_counts` order, starting at
+    `base_timestamp`. Lets houses be expanded independently of each other.
+    """
+    starts: Dict[str, float] = {}
+    for name, n_rows in row_counts.items():
+        starts[name] = base_timestamp
+        base_timestamp += TIME_STEP * n_rows * repeats.get(name, 1)
+    return starts
+
+
+def expand_house(
+    values: np.ndarray, repeat: int, start_timestamp: float, synthetic: bool = False
+) -> np.ndarray:
+    """
+    Repeat `values` `repeat` times with timestamps `start_timestamp` + 60s per row.
+    If `synthetic`, only propagate timestamp and channel columns.
+    """
+    n_rows, _, _ = values.shape
+    cols = values.shape[1] if not synthetic else 2 + 1
+    expanded = np.empty((n_rows * repeat, cols, 2))
+    blocks = expanded.reshape(repeat, n_rows, cols, 2)
+    blocks[:, :, 1:] = values[np.newaxis, :, 1:cols]
+    timestamps = timestamp_ramp(start_timestamp, 0, n_rows * repeat)
+    expanded[:, 0, :] = timestamps[:, np.newaxis]
+    return expanded
+
+
+def activation_pool(
+    houses: Dict[str, np.ndarray], idx: int, threshold: float = ACTIVATION_THRESHOLD
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Power rows of appliance channel `idx` of every house, concatenated, with
+    the start and length of every activation (run of rows whose active power
+    is above `threshold`) in them.
+    """
+    values = np.concatenate([data[:, idx] for data in houses.values()])
+    on = values[:, 0] > threshold
+    bounds = np.concatenate(([0], np.cumsum([len(data) for data in houses.values()])))
+    # Activations must not run across the boundary of two houses
+    on[bounds[1:-1] - 1] = False
+    edges = np.diff(on.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    return values, starts, np.flatnonzero(edges == -1) - starts
+
+
+def place_activations(
+    rng: np.random.Generator,
+    pool: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    n_rows: int,
+) -> np.ndarray:
+    """
+    (n_rows, 2) appliance channel made of activations drawn at random from
+    `pool`, at the rate they occur in it, placed at random non-overlapping
+    positions.
+    """
+    values, starts, lengths = pool
+    out = np.zeros((n_rows, 2))
+    if not len(starts):
+        return out
+    chosen = rng.integers(
+        0, len(starts), rng.poisson(len(starts) * n_rows / len(values))
+    )
+    chosen = chosen[np.cumsum(lengths[chosen]) <= n_rows]
+    lengths = lengths[chosen]
+    gaps = rng.multinomial(
+        n_rows - lengths.sum(), np.full(len(chosen) + 1, 1.0 / (len(chosen) + 1))
+    )
+    first = np.cumsum(lengths) - lengths
+    dest = np.cumsum(gaps[:-1]) + first
+    # Segment and offset within the segment of every placed row
+    segment = np.repeat(np.arange(len(chosen)), lengths)
+    offset = np.arange(lengths.sum()) - first[segment]
+    out[dest[segment] + offset] = values[starts[chosen][segment] + offset]
+    return out
+
+
+def recombine_house(
+    rng: np.random.Generator,
+    data: np.ndarray,
+    pools: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+) -> np.ndarray:
+    """
+    New (rows, 5, 2) timeline of house `data`: its background load (aggregate
+    minus appliances) plus appliance channels rebuilt by `place_activations`.
+    Timestamps are left for the caller to set.
+    """
+    out = np.empty_like(data)
+    background = np.maximum(data[:, 1] - data[:, 2:].sum(axis=1), 0)
+    out[:, 1] = background
+    for ap, idx in APPLIANCE_INDICES.items():
+        out[:, idx] = place_activations(rng, pools[ap], len(data))
+        out[:, 1] += out[:, idx]
+    return out
+
+
+def active_windows(
+    values: np.ndarray,
+    bounds: np.ndarray,
+    window_rows: int,
+    min_active_rows: int,
+    threshold: float = ACTIVATION_THRESHOLD,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Start, length and activity of every window of `window_rows` rows of the
+    (rows, 2) appliance channel `values`, made of the houses starting at
+    `bounds[:-1]`. Windows never cross houses: the rows of a house after its
+    last whole window are left out, so that every window written starts at a
+    multiple of `window_rows`. Windows are active if at least
+    `min_active_rows` of their rows have an active power above `threshold`.
+    """
+    starts = np.concatenate(
+        [
+            np.arange(a, b - window_rows + 1, window_rows)
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+    )
+    ends = starts + window_rows
+    on_count = np.concatenate(([0], np.cumsum(values[:, 0] > threshold)))
+    active = on_count[ends] - on_count[starts] >= min_active_rows
+    return starts, ends - starts, active
+
+
+def balance_copies(
+    rng: np.random.Generator, active: np.ndarray, active_ratio: float
+) -> np.ndarray:
+    """
+    Number of times to write every window so that active windows are at least
+    `active_ratio` times as many as idle ones. Every window is kept once and
+    the missing active windows are spread evenly over the active ones.
+    """
+    copies = np.ones(len(active), dtype=np.int64)
+    n_active = int(active.sum())
+    missing = int(np.ceil(active_ratio * (len(active) - n_active))) - n_active
+    if missing <= 0 or not n_active:
+        return copies
+    active_idx = np.flatnonzero(active)
+    copies[active_idx] += missing // n_active
+    copies[rng.choice(active_idx, missing % n_active, replace=False)] += 1
+    return copies
+
+
+def window_rows_index(
+    starts: np.ndarray, lengths: np.ndarray, copies: np.ndarray
+) -> np.ndarray:
+    """
+    Source row of every output row when window `i` is written `copies[i]`
+    times in a row.
+    """
+    window = np.repeat(np.arange(len(starts)), copies)
+    lengths = lengths[window]
+    first = np.cumsum(lengths) - lengths
+    return np.repeat(starts[window] - first, lengths) + np.arange(lengths.sum())
+
+
+def house_stats(data: np.ndarray, threshold: float = ACTIVATION_THRESHOLD) -> Dict:
+    """
+    Row count of house `data` and the number of rows each appliance is on.
+    """
+    return {
+        "rows": len(data),
+        "active_rows": {
+            ap: int(np.count_nonzero(data[:, idx, 0] > threshold))
+            for ap, idx in APPLIANCE_INDICES.items()
+        },
+    }
+
+
+def plan_repeat_factors(
+    stats: Dict[str, Dict], objective: str = "rows", budget: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Repeat factor of every house of `stats` (as returned by `house_stats`).
+    Factors are inversely proportional to the house rows ("rows") or active
+    appliance rows ("balance"), so that every house contributes alike. They
+    are scaled so that the repeated houses fill `budget` output rows, or so
+    that the smallest factor is 1 without a budget. Every house is kept at
+    least once, even if that exceeds the budget. Houses without rows (or
+    without active rows) have nothing to contribute and are kept once.
+    """
+    if objective not in PLAN_OBJECTIVES:
+        raise ValueError(f"Unknown planner objective {objective}.")
+    names = list(stats)
+    rows = np.array([stats[name]["rows"] for name in names], dtype=np.float64)
+    if objective == "rows":
+        counts = rows
+    else:
+        active = [sum(stats[name]["active_rows"].values()) for name in names]
+        counts = np.array(active, dtype=np.float64)
+    weight = np.divide(1.0, counts, out=np.zeros(len(names)), where=counts > 0)
+    weighted = weight > 0
+    if not weighted.any():
+        factors = np.ones(len(names))
+    elif budget is None:
+        factors = np.maximum(np.round(weight / weight[weighted].min()), 1)
+    else:
+        target = weight * budget / (rows * weight).sum()
+        factors = np.maximum(np.floor(target), 1)
+        # Houses raised to one repeat are paid for by the others, furthest
+        # above their target first
+        while (rows * factors).sum() > budget and (factors > 1).any():
+            excess = np.where(factors > 1, factors - target, -np.inf)
+            factors[np.argmax(excess)] -= 1
+        # Then spend what is left of the budget on the houses furthest below
+        # their target, one repeat at a time
+        for i in np.argsort(factors - target):
+            if weighted[i] and (rows * factors).sum() + rows[i] <= budget:
+                factors[i] += 1
+        if (rows * factors).sum() > budget:
+            print(f"Warning: keeping every house once exceeds {budget} rows.")
+    return {name: int(factor) for name, factor in zip(names, factors)}
+
+
+class RepetitionSampler:
+    """
+    Batches of `sample_size` windows over the virtual output of random
+    assignment, where each house appears `repeats[house]` times in a row.
+    Windows are gathered from the original house arrays and timestamps are
+    computed on the fly, so nothing is materialized per repeat. Implements
+    `__len__`/`__getitem__`/`on_epoch_end`, so it can be used wherever a Keras
+    `Sequence` is expected.
+    """
+
+    def __init__(
+        self,
+        houses: Dict[str, np.ndarray],
+        repeats: Dict[str, int],
+        appliance: str,
+        base_timestamp: float,
+        sample_size: int = SAMPLE_SIZE,
+        batch_size: int = 16,
+        shuffle: bool = False,
+        seed: Optional[int] = None,
+    ):
+        idx = APPLIANCE_INDICES[appliance]
+        self._source = np.concatenate([data[:, [1, idx]] for data in houses.values()])
+        rows = np.array([len(data) for data in houses.values()], dtype=np.int64)
+        virtual_rows = rows * [repeats.get(name, 1) for name in houses]
+        self._house_rows = rows
+        self._source_starts = np.concatenate(([0], np.cumsum(rows)[:-1]))
+        self._virtual_starts = np.concatenate(([0], np.cumsum(virtual_rows)[:-1]))
+        self._base_timestamp = base_timestamp
+        self._sample_size = sample_size
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(int(virtual_rows.sum()) // sample_size)
+        if shuffle:
+            self._rng.shuffle(self._order)
+
+    @property
+    def n_windows(self) -> int:
+        return len(self._order)
+
+    def __len__(self) -> int:
+        return -(-self.n_windows // self._batch_size)
+
+    def __getitem__(self, batch: int) -> np.ndarray:
+        """
+        Return batch `batch` as an array of shape (batch_size, sample_size, 3, 2).
+        """
+        windows = self._order[batch * self._batch_size : (batch + 1) * self._batch_size]
+        rows = windows[:, np.newaxis] * self._sample_size + np.arange(self._sample_size)
+        house = np.searchsorted(self._virtual_starts, rows, side="right") - 1
+        local = (rows - self._virtual_starts[house]) % self._house_rows[house]
+
+        timestamps = self._base_timestamp + TIME_STEP * (rows + 1.0)
+        out = np.empty(rows.shape + (3, 2))
+        out[..., 0, :] = timestamps[..., np.newaxis]
+        out[..., 1:, :] = self._source[self._source_starts[house] + local]
+        return out
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for batch in range(len(self)):
+            yield self[batch]
+
+    def on_epoch_end(self) -> None:
+        if self._shuffle:
+            self._rng.shuffle(self._order)
+
 
 class DataAggregator:
-    def __init__(self, house_files: Dict[str, Path], repeat_factor: Dict[str, int]):
+    def __init__(
+        self,
+        house_files: Dict[str, Path],
+        repeat_factor: Dict[str, int],
+        output_format: str = "pickle",
+        max_memory: Optional[int] = None,
+        workers: int = 1,
+        output_files: Optional[Dict[str, Path]] = None,
+        loaded: Optional[Dict[Path, np.ndarray]] = None,
+        synthetic_days: Optional[int] = None,
+        seed: int = 0,
+        synthetic_files: Optional[Dict[str, Path]] = None,
+        codec: str = "zlib",
+        transforms: Optional[Dict] = None,
+        balance: Optional[Dict] = None,
+        shared: Optional[SharedArrayCache] = None,
+        pipeline: bool = False,
+        stats: bool = False,
+        resample: Optional[Dict] = None,
+        generated: Optional[Dict[Tuple[str, int, int], np.ndarray]] = None,
+    ):
         self._house_files = house_files
         self._repeat_factor = repeat_factor
-        self._base_timestamp = datetime.strptime(
+        self._output_format = output_format
+        self._max_memory = max_memory
+        self._workers = workers
+        self._output_files = output_files if output_files is not None else OUTPUT_FILES
+        # Arrays already loaded by this or other aggregators, keyed by path
+        self._loaded = loaded
+        # Shared-memory cache of the arrays, used by concurrent runs
+        self._shared = shared
+        # Overlap loading, transforming and writing through bounded queues
+        self._pipeline = pipeline
+        # Statistics of the rows written to each output, if collected
+        self._stats: Optional[Dict[str, ChannelStats]] = {} if stats else None
+        # Keyword arguments of utils.resample.resample applied to the houses
+        self._resample = resample
+        # Generate this many days of synthetic data instead of SYNTHETIC_FILES
+        self._synthetic_days = synthetic_days
+        self._seed = seed
+        # Synthetic arrays already generated by this or other aggregators,
+        # keyed by (appliance, synthetic_days, seed)
+        self._generated = generated
+        self._synthetic_files = (
+            synthetic_files if synthetic_files is not None else SYNTHETIC_FILES
+        )
+        # Compression codec of the chunked output format
+        self._codec = codec
+        self._transforms = transforms if transforms is not None else DEFAULT_TRANSFORMS
+        self._balance = balance if balance is not None else DEFAULT_BALANCE
+        # Rows of every house and synthetic source used by the last run
+        self._source_rows: Dict[str, int] = {}
+        self._initial_timestamp = datetime.strptime(
             "2020-02-16 14:30:00", "%Y-%m-%d %H:%M:%S"
         ).timestamp()
+        self._base_timestamp = self._initial_timestamp
+
+    def _read(self, path: Path) -> np.ndarray:
+        with PROFILER.stage("load", path=str(path)) as record:
+            record["bytes_read"] = file_bytes(path)
+            return np.asarray(load_array(path))
+
+    def _read_resampled(self, path: Path) -> np.ndarray:
+        """
+        House recording `path` resampled onto the TIME_STEP grid, read in
+        chunks when its format allows it.
+        """
+        with PROFILER.stage("load", path=str(path)) as record:
+            record["bytes_read"] = file_bytes(path)
+            data = load_array(path)
+        report: Dict = {}
+        with PROFILER.stage("resample", path=str(path), rows=len(data)) as record:
+            data = resample(data, TIME_STEP, report=report, **self._resample)
+            record.update(report)
+        print(f"Resampled {path.name} to {len(data)} rows: {report}")
+        return data
 
     def _load(self, path: Path) -> np.ndarray:
-        with path.open("rb") as f:
-            return pickle.load(f)
+        read, variant = self._read, ""
+        if self._resample is not None and path in self._house_files.values():
+            read = self._read_resampled
+            variant = json.dumps(self._resample, sort_keys=True)
+        if self._shared is not None:
+            read = lambda path, read=read: self._shared.get(path, read, variant)
+        if self._loaded is None:
+            return read(path)
+        if path not in self._loaded:
+            self._loaded[path] = read(path)
+        return self._loaded[path]
 
-    def _save_aggregated(self, data: np.ndarray, appliance: str) -> None:
-        out_path = OUTPUT_FILES[appliance]
+    def output_paths(self) -> Dict[str, Path]:
+        return {
+            appliance: format_path(path, self._output_format)
+            for appliance, path in self._output_files.items()
+        }
+
+    def _output_path(self, appliance: str) -> Path:
+        """
+        Path to write the output of `appliance` to. Any previous file is
+        unlinked first so that hard links held by the cache stay intact.
+        """
+        out_path = format_path(self._output_files[appliance], self._output_format)
         os.makedirs(out_path.parent, exist_ok=True)
-        with out_path.open("wb") as f:
-            pickle.dump(data, f)
+        out_path.unlink(missing_ok=True)
+        if self._stats is not None:
+            self._stats.pop(appliance, None)
+        return out_path
+
+    def _observe(self, appliance: str, data: np.ndarray) -> None:
+        """
+        Add the power channels of rows `data` of `appliance`, just written, to
+        its statistics. Memory-mapped outputs are read back a chunk at a time.
+        """
+        if self._stats is None:
+            return
+        stats = self._stats.setdefault(appliance, ChannelStats(WINDOW_CHANNELS))
+        with PROFILER.stage("stats", appliance=appliance, rows=len(data)):
+            for start in range(0, len(data), TRANSFORM_CHUNK_ROWS):
+                rows = np.asarray(data[start : start + TRANSFORM_CHUNK_ROWS])
+                stats.update(rows[:, 1:].reshape(len(rows), len(WINDOW_CHANNELS)))
+
+    def _chunk_stats(
+        self, stats: Dict[str, ChannelStats], appliance: str, rows: np.ndarray
+    ) -> None:
+        """
+        Add the power channels of output `rows` of `appliance`, still in
+        memory, to the per-task `stats`, if statistics are collected.
+        """
+        if self._stats is None:
+            return
+        values = rows[:, 1:].reshape(len(rows), len(WINDOW_CHANNELS))
+        stats.setdefault(appliance, ChannelStats(WINDOW_CHANNELS)).update(values)
+
+    def _merged_stats(
+        self, parts: Iterable[Dict[str, ChannelStats]], appliance: str
+    ) -> Optional[ChannelStats]:
+        """
+        Statistics of `appliance` merged from the per-task `parts`.
+        """
+        if self._stats is None:
+            return None
+        merged = ChannelStats(WINDOW_CHANNELS)
+        for part in parts:
+            if appliance in part:
+                merged.merge(part[appliance])
+        return merged
+
+    def stats_path(self) -> Path:
+        return next(iter(self._output_files.values())).parent / FEATURE_STATS_FILE
+
+    def write_stats(self, percentile: Optional[float] = None) -> Path:
+        """
+        Write the statistics of the outputs of the last run to `stats_path`.
+        """
+        path = self.stats_path()
+        save_stats(path, self._stats, percentile)
+        return path
+
+    def _save_aggregated(
+        self, data: np.ndarray, appliance: str, stats: Optional[ChannelStats] = None
+    ) -> None:
+        """
+        Save the output `data` of `appliance`, with its `stats` if they were
+        collected as it was filled, or else by a pass over `data`.
+        """
+        out_path = self._output_path(appliance)
+        with PROFILER.stage("save", appliance=appliance, rows=len(data)) as record:
+            save_array(out_path, data, self._output_format, self._codec)
+            record["bytes_written"] = file_bytes(out_path)
+        if stats is None:
+            self._observe(appliance, data)
+        else:
+            self._stats[appliance] = stats
 
     def _save_all_aggregate(
         self, data_map: Dict[str, np.ndarray], print_shapes: bool = False
@@ -107,97 +684,883 @@ class DataAggregator:
             if print_shapes:
                 print(f"{appliance} shape: {arr.shape}")
 
+    def _map(self, func: Callable, *iterables) -> List:
+        """
+        `map` over a thread pool of `workers` threads (NumPy copies and file
+        reads release the GIL), or sequentially for a single worker.
+        """
+        if self._workers <= 1:
+            return list(map(func, *iterables))
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            return list(pool.map(func, *iterables))
+
+    def _load_all(self, paths: Dict[str, Path]) -> Dict[str, np.ndarray]:
+        for name in paths:
+            print(f"Processing {name} ...")
+        loaded = dict(zip(paths, self._map(self._load, paths.values())))
+        self._source_rows.update((name, len(data)) for name, data in loaded.items())
+        return loaded
+
+    def _timestamps(self, count: int) -> np.ndarray:
+        """
+        Return the next `count` timestamps (+60s per row) and advance the base.
+        """
+        ramp = timestamp_ramp(self._base_timestamp, 0, count)
+        self._base_timestamp += TIME_STEP * count
+        return ramp
+
     def _repeat_array(
         self, repeat: int, values: np.ndarray, synthetic: bool = False
-    ) -> Tuple[np.ndarray, float]:
+    ) -> np.ndarray:
         """
         Repeat `values` `repeat` times, updating timestamps by +60s per row.
         If `synthetic`, only propagate timestamp and channel columns.
         """
-        n_rows, _, _ = values.shape
-        cols = values.shape[1] if not synthetic else 2 + 1
-        expanded = np.empty((n_rows * repeat, cols, 2))
-        idx = 0
-        for _ in range(repeat):
-            for row in values:
-                self._base_timestamp += 60
-                if synthetic:
-                    expanded[idx] = [
-                        [self._base_timestamp, self._base_timestamp],
-                        row[1],
-                        row[2],
-                    ]
-                else:
-                    expanded[idx] = row
-                    expanded[idx][0] = [self._base_timestamp, self._base_timestamp]
-                idx += 1
-
+        expanded = expand_house(values, repeat, self._base_timestamp, synthetic)
+        self._base_timestamp += TIME_STEP * len(expanded)
         return expanded
 
     def _aggregate_data(self, repeats: Dict[str, int]) -> np.ndarray:
-        chunks: List[np.ndarray] = []
-        for name, path in self._house_files.items():
-            print(f"Processing {name} ...")
-            data = self._load(path)
-            augmented_arr = self._repeat_array(repeats.get(name, 1), data)
-            chunks.append(augmented_arr)
+        houses = self._load_all(self._house_files)
+        row_counts = {name: len(data) for name, data in houses.items()}
+        starts = plan_timestamps(row_counts, repeats, self._base_timestamp)
+        with PROFILER.stage("repeat") as record:
+            chunks = self._map(
+                lambda name: expand_house(
+                    houses[name], repeats.get(name, 1), starts[name]
+                ),
+                houses,
+            )
+            record["rows"] = sum(len(chunk) for chunk in chunks)
+        self._base_timestamp += TIME_STEP * record["rows"]
+
+        with PROFILER.stage("concatenate", rows=record["rows"]):
+            return np.concatenate(chunks, axis=0)
 
-        return np.concatenate(chunks, axis=0)
+    def _synthetic_sources(self) -> Dict[str, np.ndarray]:
+        if self._synthetic_days is None:
+            return self._load_all(self._synthetic_files)
+        sources: Dict[str, np.ndarray] = {}
+        for appliance in self._synthetic_files:
+            key = (appliance, self._synthetic_days, self._seed)
+            if self._generated is not None and key in self._generated:
+                sources[appliance] = self._generated[key]
+            else:
+                print(f"Generating {self._synthetic_days} days of {appliance} ...")
+                with PROFILER.stage("generate", appliance=appliance):
+                    sources[appliance] = generate_appliance(
+                        appliance, self._synthetic_days, self._seed, self._workers
+                    )
+                if self._generated is not None:
+                    self._generated[key] = sources[appliance]
+            self._source_rows[appliance] = len(sources[appliance])
+        return sources
 
     def _load_synthetic(self) -> Dict[str, np.ndarray]:
         synth_data: Dict[str, np.ndarray] = {}
-        for appliance, path in SYNTHETIC_FILES.items():
-            data = self._load(path)
-            augmented_arr = self._repeat_array(1, data, synthetic=True)
+        for appliance, data in self._synthetic_sources().items():
+            with PROFILER.stage("repeat", appliance=appliance, rows=len(data)):
+                augmented_arr = self._repeat_array(1, data, synthetic=True)
             synth_data[appliance] = augmented_arr
 
         return synth_data
 
     def _extract_channels(self, data: np.ndarray) -> Dict[str, np.ndarray]:
         channels: Dict[str, np.ndarray] = {}
-        for appliance, idx in APPLIANCE_INDICES.items():
-            channels[appliance] = data[:, [0, 1, idx], :]
+        with PROFILER.stage("extract_channels", rows=len(data)):
+            for appliance, idx in APPLIANCE_INDICES.items():
+                channels[appliance] = data[:, [0, 1, idx], :]
         return channels
 
-    def mode_default(self) -> None:
-        print("Running default mode...")
-        repeats = {name: 1 for name in self._house_files}
+    def _allocate_output(self, appliance: str, n_rows: int) -> np.ndarray:
+        """
+        Allocate the (n_rows, 3, 2) output of `appliance`. The npy backend maps
+        it straight onto the output file instead of holding it in RAM.
+        """
+        shape = (n_rows, 3, 2)
+        if self._output_format == "npy":
+            return np.lib.format.open_memmap(
+                self._output_path(appliance), mode="w+", dtype=np.float64, shape=shape
+            )
+        return np.empty(shape)
+
+    def _finalize_output(
+        self, appliance: str, out: np.ndarray, stats: Optional[ChannelStats]
+    ) -> None:
+        """
+        Flush or save the filled output of `appliance`. `stats` are its
+        statistics, merged from the tasks that filled it (None if they are
+        not collected).
+        """
+        if isinstance(out, np.memmap):
+            with PROFILER.stage("save", appliance=appliance, rows=len(out)) as record:
+                out.flush()
+                record["bytes_written"] = file_bytes(out.filename)
+            if stats is not None:
+                self._stats[appliance] = stats
+        else:
+            self._save_aggregated(out, appliance, stats)
+        print(f"{appliance} shape: {out.shape}")
+
+    def _chunk_rows(self, resident_bytes: int) -> int:
+        """
+        Rows per chunk so that one chunk of an output fits in what is left of
+        the memory budget after `resident_bytes`.
+        """
+        row_bytes = 3 * 2 * 8
+        available = self._max_memory - resident_bytes
+        if available < MIN_CHUNK_ROWS * row_bytes:
+            raise ValueError(
+                f"Memory budget of {self._max_memory // 2**20} MB is below the "
+                f"{-(-(resident_bytes + MIN_CHUNK_ROWS * row_bytes) // 2**20)} MB "
+                "needed for the houses and one output."
+            )
+        return available // row_bytes
+
+    def _fill_house(
+        self,
+        outputs: Dict[str, np.ndarray],
+        offset: int,
+        data: np.ndarray,
+        repeat: int,
+        start_timestamp: float,
+        chunk: int,
+    ) -> Dict[str, ChannelStats]:
+        """
+        Write `repeat` copies of house `data` into the appliance `outputs`
+        from row `offset` on, `chunk` rows at a time. Returns the statistics
+        of the rows written to each output.
+        """
+        stats: Dict[str, ChannelStats] = {}
+        written = 0
+        with PROFILER.stage("repeat", rows=len(data) * repeat, offset=offset):
+            for _ in range(repeat):
+                for start in range(0, len(data), chunk):
+                    rows = data[start : start + chunk]
+                    begin, end = offset + written, offset + written + len(rows)
+                    timestamps = timestamp_ramp(start_timestamp, written, len(rows))
+                    for ap, out in outputs.items():
+                        out[begin:end, 0] = timestamps[:, np.newaxis]
+                        out[begin:end, 1] = rows[:, 1]
+                        out[begin:end, 2] = rows[:, APPLIANCE_INDICES[ap]]
+                        self._chunk_stats(stats, ap, out[begin:end])
+                    written += len(rows)
+        return stats
+
+    def _aggregate_preallocated(
+        self, repeats: Dict[str, int], with_synthetic: bool
+    ) -> None:
+        """
+        Size each appliance output up front and write every house (and the
+        synthetic data) straight into it, in chunks bounded by `max_memory`.
+        Outputs are filled and saved one at a time, so at most one is held in
+        RAM (none for npy, which is mapped onto the output file).
+        """
+        houses = self._load_all(self._house_files)
+        synth: Dict[str, np.ndarray] = {}
+        if with_synthetic:
+            synth = self._synthetic_sources()
+
+        house_rows = sum(
+            len(data) * repeats.get(name, 1) for name, data in houses.items()
+        )
+        sizes = {ap: house_rows + len(synth.get(ap, ())) for ap in APPLIANCE_INDICES}
+        resident = sum(arr.nbytes for arr in houses.values())
+        resident += sum(arr.nbytes for arr in synth.values())
+        if self._output_format != "npy":
+            resident += max(sizes.values()) * 3 * 2 * 8
+        saving = resident + max(sizes.values()) * SAVE_ROW_BYTES[self._output_format]
+        if saving > self._max_memory:
+            raise ValueError(
+                f"Memory budget of {self._max_memory // 2**20} MB is below the "
+                f"{-(-saving // 2**20)} MB needed to save the largest "
+                f"{self._output_format} output."
+            )
+        chunk = max(MIN_CHUNK_ROWS, self._chunk_rows(resident) // self._workers)
+
+        row_counts = {name: len(data) for name, data in houses.items()}
+        starts = plan_timestamps(row_counts, repeats, self._base_timestamp)
+        offsets: Dict[str, int] = {}
+        offset = 0
+        for name, n_rows in row_counts.items():
+            offsets[name] = offset
+            offset += n_rows * repeats.get(name, 1)
+        self._base_timestamp += TIME_STEP * house_rows
+        synth_rows = {ap: len(data) for ap, data in synth.items()}
+        synth_starts = plan_timestamps(synth_rows, {}, self._base_timestamp)
+        self._base_timestamp += TIME_STEP * sum(synth_rows.values())
+
+        for ap in APPLIANCE_INDICES:
+            outputs = {ap: self._allocate_output(ap, sizes[ap])}
+            parts = self._map(
+                lambda name: self._fill_house(
+                    outputs,
+                    offsets[name],
+                    houses[name],
+                    repeats.get(name, 1),
+                    starts[name],
+                    chunk,
+                ),
+                houses,
+            )
+            data = synth.get(ap, ())
+            synth_stats: Dict[str, ChannelStats] = {}
+            for start in range(0, len(data), chunk):
+                rows = data[start : start + chunk]
+                begin = house_rows + start
+                timestamps = timestamp_ramp(synth_starts[ap], start, len(rows))
+                outputs[ap][begin : begin + len(rows), 0] = timestamps[:, np.newaxis]
+                outputs[ap][begin : begin + len(rows), 1:] = rows[:, 1:3]
+                self._chunk_stats(
+                    synth_stats, ap, outputs[ap][begin : begin + len(rows)]
+                )
+            parts.append(synth_stats)
+            self._finalize_output(ap, outputs.pop(ap), self._merged_stats(parts, ap))
+        houses.clear()
+
+    def check_inputs(self, with_synthetic: bool) -> bool:
+        """
+        Run the integrity checks of utils.integrity on the house (and
+        synthetic) files, printing a report of each. Houses are checked as
+        recorded, before any resampling, so that the gaps and disorder it
+        would smooth over are reported. Loaded arrays are kept for the run if
+        the aggregator shares a `loaded` dict.
+        """
+        paths = dict(self._house_files)
+        if with_synthetic and self._synthetic_days is None:
+            paths.update(self._synthetic_files)
+
+        def check(path: Path) -> Dict:
+            if self._resample is not None and path in self._house_files.values():
+                with PROFILER.stage("load", path=str(path)) as record:
+                    record["bytes_read"] = file_bytes(path)
+                    data = load_array(path)
+            else:
+                data = self._load(path)
+            with PROFILER.stage("check", path=str(path), rows=len(data)):
+                return check_array(data)
+
+        reports = dict(zip(paths, self._map(check, paths.values())))
+        for name, report in reports.items():
+            print(format_report(name, report))
+        return all(is_valid(report) for report in reports.values())
+
+    def plan_repeats(
+        self, objective: str = "rows", budget: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Repeat factors of the houses planned by `plan_repeat_factors` from
+        their row counts and appliance activity.
+        """
+        houses = self._load_all(self._house_files)
+        with PROFILER.stage("plan"):
+            stats = {name: house_stats(data) for name, data in houses.items()}
+            return plan_repeat_factors(stats, objective, budget)
+
+    def sampler(
+        self,
+        appliance: str,
+        batch_size: int = 16,
+        sample_size: int = SAMPLE_SIZE,
+        shuffle: bool = False,
+        seed: Optional[int] = None,
+    ) -> RepetitionSampler:
+        """
+        Lazy alternative to `mode_random_assignment` for `appliance`: the same
+        windows and timestamps, without writing the repeated copies to disk.
+        """
+        houses = self._load_all(self._house_files)
+        repeats = {name: self._repeat_factor.get(name, 1) for name in houses}
+        return RepetitionSampler(
+            houses,
+            repeats,
+            appliance,
+            self._base_timestamp,
+            sample_size=sample_size,
+            batch_size=batch_size,
+            shuffle=shuffle,
+            seed=seed,
+        )
+
+    def _aggregate_and_save(
+        self, repeats: Dict[str, int], with_synthetic: bool
+    ) -> None:
+        if self._pipeline and self._output_format in STREAM_FORMATS:
+            self._write_channels(self._pipelined_chunks(repeats, with_synthetic))
+            return
+        if self._pipeline:
+            # The chunks would be held until the end and concatenated, doubling
+            # the memory of every output for no overlap
+            print(f"{self._output_format} outputs cannot be streamed, not pipelining.")
+        if self._max_memory is not None:
+            self._aggregate_preallocated(repeats, with_synthetic)
+            return
+
         agg = self._aggregate_data(repeats)
         channels = self._extract_channels(agg)
+        if with_synthetic:
+            synth = self._load_synthetic()
+            channels = {
+                ap: np.concatenate((channels[ap], synth[ap]), axis=0) for ap in channels
+            }
         self._save_all_aggregate(channels, print_shapes=True)
+
+    def _state_path(self) -> Path:
+        return next(iter(self._output_files.values())).parent / INCREMENTAL_STATE_FILE
+
+    def _output_stats(self) -> Dict[str, List[int]]:
+        return {
+            ap: [path.stat().st_size, path.stat().st_mtime_ns]
+            for ap, path in self.output_paths().items()
+        }
+
+    def _read_state(self, params: Dict) -> Optional[Dict]:
+        """
+        State left by the last incremental run, if it was run with `params`
+        and the outputs have not been rewritten since.
+        """
+        try:
+            with self._state_path().open() as f:
+                state = json.load(f)
+            if state["params"] == params and state["outputs"] == self._output_stats():
+                return state
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _write_state(self, params: Dict) -> None:
+        state = {
+            "params": params,
+            "rows": self._source_rows,
+            "next_timestamp": self._base_timestamp,
+            "outputs": self._output_stats(),
+        }
+        with self._state_path().open("w") as f:
+            json.dump(state, f, indent=2)
+
+    def _previous_stats(self) -> Dict[str, ChannelStats]:
+        """
+        Statistics of the existing outputs, from their sidecar, or computed
+        from the outputs if it is missing.
+        """
+        if self.stats_path().is_file():
+            return load_stats(self.stats_path())
+        print("No statistics sidecar found, reading the existing outputs.")
+        self._stats = {}
+        for ap, path in self.output_paths().items():
+            self._observe(ap, load_array(path))
+        return self._stats
+
+    def update(self, mode: str) -> None:
+        """
+        Incremental version of `mode`: append to the existing outputs only the
+        rows added to the house (and synthetic) files since the last update,
+        repeated and timestamped as if they had been aggregated then.
+        Falls back to a full run when there is no matching state.
+        """
+        if mode not in INCREMENTAL_MODES:
+            raise ValueError(f"{mode} outputs cannot be updated incrementally.")
+        if self._resample is not None:
+            raise ValueError("Resampled outputs cannot be updated incrementally.")
+        repeats = {
+            name: self._repeat_factor.get(name, 1) if mode in RANDOM_ASSIGN_MODES else 1
+            for name in self._house_files
+        }
+        params = {
+            "mode": mode,
+            "repeats": repeats,
+            "output_format": self._output_format,
+            "codec": self._codec,
+            "synthetic_days": self._synthetic_days,
+            "seed": self._seed,
+        }
+        state = self._read_state(params)
+        houses = self._load_all(self._house_files) if state is not None else {}
+        synth = {}
+        if state is not None and mode in SYNTHETIC_MODES:
+            synth = self._synthetic_sources()
+        if state is None or any(
+            self._source_rows[name] < state["rows"].get(name, np.inf)
+            for name in self._source_rows
+        ):
+            print("No incremental state matches the outputs, aggregating all rows.")
+            self._base_timestamp = self._initial_timestamp
+            self._source_rows = {}
+            getattr(self, MODE_METHODS[mode])()
+            self._write_state(params)
+            return
+
+        self._base_timestamp = state["next_timestamp"]
+        if self._stats is not None:
+            self._stats = self._previous_stats()
+        appended: Dict[str, List[np.ndarray]] = {ap: [] for ap in APPLIANCE_INDICES}
+        for name, data in houses.items():
+            new_rows = data[state["rows"][name] :]
+            if len(new_rows):
+                print(f"Appending {len(new_rows)} new rows of {name} ...")
+                expanded = self._repeat_array(repeats[name], new_rows)
+                for ap, channel in self._extract_channels(expanded).items():
+                    appended[ap].append(channel)
+        for ap, data in synth.items():
+            new_rows = data[state["rows"][ap] :]
+            if len(new_rows):
+                print(f"Appending {len(new_rows)} new synthetic rows of {ap} ...")
+                appended[ap].append(self._repeat_array(1, new_rows, synthetic=True))
+
+        for ap, path in self.output_paths().items():
+            if not appended[ap]:
+                continue
+            rows = np.concatenate(appended[ap])
+            with PROFILER.stage("append", appliance=ap, rows=len(rows)) as record:
+                size = file_bytes(path)
+                append_array(path, rows, self._output_format, self._codec)
+                record["bytes_written"] = file_bytes(path) - size
+            self._observe(ap, rows)
+            print(f"{ap}: appended {len(rows)} rows.")
+        self._write_state(params)
+
+    def mode_default(self) -> None:
+        print("Running default mode...")
+        repeats = {name: 1 for name in self._house_files}
+        self._aggregate_and_save(repeats, with_synthetic=False)
         print("default mode completed.")
 
     def mode_random_assignment(self) -> None:
         print("Running random assignment mode...")
         repeats = {name: self._repeat_factor.get(name, 1) for name in self._house_files}
-        agg = self._aggregate_data(repeats)
-        channels = self._extract_channels(agg)
-        self._save_all_aggregate(channels, print_shapes=True)
+        self._aggregate_and_save(repeats, with_synthetic=False)
         print("random_assignment mode completed.")
 
     def mode_synthetic_modelling(self) -> None:
         print("Running synthetic_modelling mode...")
-        agg = self._aggregate_data({name: 1 for name in self._house_files})
-        channels = self._extract_channels(agg)
-        synth = self._load_synthetic()
-        final = {
-            ap: np.concatenate((channels[ap], synth[ap]), axis=0) for ap in channels
-        }
-        self._save_all_aggregate(final, print_shapes=True)
+        repeats = {name: 1 for name in self._house_files}
+        self._aggregate_and_save(repeats, with_synthetic=True)
         print("synthetic_modelling mode completed.")
 
     def mode_merged(self) -> None:
         print("Running merged mode (random assignment + synthetic data)...")
         repeats = {name: self._repeat_factor.get(name, 1) for name in self._house_files}
-        agg = self._aggregate_data(repeats)
-        channels = self._extract_channels(agg)
-        synth = self._load_synthetic()
-        final = {
-            ap: np.concatenate((channels[ap], synth[ap]), axis=0) for ap in channels
-        }
-        self._save_all_aggregate(final, print_shapes=True)
+        self._aggregate_and_save(repeats, with_synthetic=True)
         print("Merged mode completed.")
 
+    def _drain(self, appliance: str, chunks: queue.Queue) -> int:
+        """
+        Write the chunks of `appliance` taken from `chunks` until None comes.
+        npy and chunked outputs grow on disk chunk by chunk (the chunked
+        footer is written once, at the end); other formats are written once
+        all chunks are in. Returns the rows written.
+        """
+        in_place = self._output_format in STREAM_FORMATS
+        pending: List[np.ndarray] = []
+        writer: Optional[ChunkedWriter] = None
+        n_rows = 0
+        while (chunk := chunks.get()) is not None:
+            if not in_place:
+                pending.append(chunk)
+            elif self._output_format == "chunked":
+                if writer is None:
+                    writer = ChunkedWriter(
+                        self._output_path(appliance),
+                        chunk.shape[1:],
+                        chunk.dtype,
+                        codec=self._codec,
+                    )
+                with PROFILER.stage(
+                    "append", appliance=appliance, rows=len(chunk)
+                ) as record:
+                    record["bytes_written"] = writer.write(chunk)
+                self._observe(appliance, chunk)
+            elif n_rows:
+                path = self.output_paths()[appliance]
+                with PROFILER.stage(
+                    "append", appliance=appliance, rows=len(chunk)
+                ) as record:
+                    size = file_bytes(path)
+                    append_array(path, chunk, self._output_format, self._codec)
+                    record["bytes_written"] = file_bytes(path) - size
+                self._observe(appliance, chunk)
+            else:
+                self._save_aggregated(chunk, appliance)
+            n_rows += len(chunk)
+        if writer is not None:
+            writer.close()
+        if not in_place or not n_rows:
+            with PROFILER.stage("concatenate", appliance=appliance, rows=n_rows):
+                data = np.concatenate(pending or [np.empty((0, 3, 2))])
+            pending.clear()
+            self._save_aggregated(data, appliance)
+        return n_rows
+
+    def _write_channels(self, chunks: Iterator[Dict[str, np.ndarray]]) -> None:
+        """
+        Hand every {appliance: channel chunk} of `chunks` to one writer thread
+        per appliance through bounded queues, so the outputs are written while
+        the next chunks are produced.
+        """
+        queues = {ap: queue.Queue(PIPELINE_DEPTH) for ap in APPLIANCE_INDICES}
+        with ThreadPoolExecutor(max_workers=len(queues)) as pool:
+            writers = {ap: pool.submit(self._drain, ap, q) for ap, q in queues.items()}
+            try:
+                for channels in chunks:
+                    for ap, chunk in channels.items():
+                        _put(queues[ap], chunk, writers[ap])
+            finally:
+                for ap, writer in writers.items():
+                    if not writer.done():
+                        _put(queues[ap], None, writer)
+            for ap, writer in writers.items():
+                print(f"{ap} shape: {(writer.result(), 3, 2)}")
+
+    def _prefetch(self, paths: Dict[str, Path]) -> Iterator[Tuple[str, np.ndarray]]:
+        """
+        (name, array) of every file of `paths` in order, loaded by reader
+        threads up to PIPELINE_DEPTH files ahead of the consumer.
+        """
+        names = list(paths)
+        with ThreadPoolExecutor(max_workers=max(self._workers, 1)) as pool:
+            pending = deque(
+                pool.submit(self._load, paths[name]) for name in names[:PIPELINE_DEPTH]
+            )
+            for i, name in enumerate(names):
+                print(f"Processing {name} ...")
+                data = pending.popleft().result()
+                if i + PIPELINE_DEPTH < len(names):
+                    ahead = names[i + PIPELINE_DEPTH]
+                    pending.append(pool.submit(self._load, paths[ahead]))
+                self._source_rows[name] = len(data)
+                yield name, data
+
+    def _pipelined_chunks(
+        self, repeats: Dict[str, int], with_synthetic: bool
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Channel chunks of every repeated copy of every house, then of the
+        synthetic data, as houses arrive from the reader threads.
+        """
+        for name, data in self._prefetch(self._house_files):
+            for _ in range(repeats.get(name, 1)):
+                with PROFILER.stage("repeat", rows=len(data)):
+                    expanded = self._repeat_array(1, data)
+                yield self._extract_channels(expanded)
+        if not with_synthetic:
+            return
+        if self._synthetic_days is None:
+            synthetic = self._prefetch(self._synthetic_files)
+        else:
+            synthetic = self._synthetic_sources().items()
+        for ap, data in synthetic:
+            with PROFILER.stage("repeat", appliance=ap, rows=len(data)):
+                expanded = self._repeat_array(1, data, synthetic=True)
+            yield {ap: expanded}
+
+    def _write_stream(self, chunks: Iterator[np.ndarray]) -> None:
+        """
+        Timestamp each (rows, 5, 2) chunk and write its channels as it comes.
+        """
+
+        def channels() -> Iterator[Dict[str, np.ndarray]]:
+            for chunk in chunks:
+                chunk[:, 0] = self._timestamps(len(chunk))[:, np.newaxis]
+                yield self._extract_channels(chunk)
+
+        self._write_channels(channels())
+
+    def _transformed_chunks(self) -> Iterator[np.ndarray]:
+        """
+        Chunks of every house `repeat_factor` times: first as recorded, then
+        through `transform_chunks` with an RNG seeded by (seed, house, copy).
+        """
+        houses = self._load_all(self._house_files)
+        for house, (name, data) in enumerate(houses.items()):
+            for copy in range(self._repeat_factor.get(name, 1)):
+                chunks = iter_chunks(data, TRANSFORM_CHUNK_ROWS)
+                if copy:
+                    rng = np.random.default_rng([self._seed, house, copy])
+                    chunks = transform_chunks(chunks, rng, **self._transforms)
+                yield from chunks
+
+    def mode_signal_transform(self) -> None:
+        print("Running signal_transform mode...")
+        self._write_stream(self._transformed_chunks())
+        print("signal_transform mode completed.")
+
+    def _fill_recombined(
+        self,
+        outputs: Dict[str, np.ndarray],
+        pools: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        house: int,
+        data: np.ndarray,
+        copy: int,
+        offset: int,
+        start_timestamp: float,
+    ) -> Dict[str, ChannelStats]:
+        """
+        Write copy `copy` of house number `house` into every appliance output
+        from row `offset` on. Copy 0 is the house itself, later copies are
+        recombined with an RNG seeded by (seed, house, copy), so the result
+        does not depend on the number of workers. Returns the statistics of
+        the rows written to each output.
+        """
+        stats: Dict[str, ChannelStats] = {}
+        with PROFILER.stage("recombine", rows=len(data)):
+            if copy:
+                rng = np.random.default_rng([self._seed, house, copy])
+                data = recombine_house(rng, data, pools)
+            end = offset + len(data)
+            timestamps = timestamp_ramp(start_timestamp, 0, len(data))
+            for ap, idx in APPLIANCE_INDICES.items():
+                outputs[ap][offset:end, 0] = timestamps[:, np.newaxis]
+                outputs[ap][offset:end, 1] = data[:, 1]
+                outputs[ap][offset:end, 2] = data[:, idx]
+                self._chunk_stats(stats, ap, outputs[ap][offset:end])
+        return stats
+
+    def mode_random_activation(self) -> None:
+        """
+        Random appliance activation assignment: every house appears
+        `repeat_factor` times, the first time as recorded and then with its
+        appliance activations replaced by ones drawn from all houses and
+        placed at random, on top of its own background load. Each copy is
+        written straight into the (preallocated or memory-mapped) outputs.
+        """
+        print("Running random activation assignment mode...")
+        houses = self._load_all(self._house_files)
+        pools = {
+            ap: activation_pool(houses, idx) for ap, idx in APPLIANCE_INDICES.items()
+        }
+        tasks = []
+        offset = 0
+        for house, (name, data) in enumerate(houses.items()):
+            for copy in range(self._repeat_factor.get(name, 1)):
+                start_timestamp = self._base_timestamp + TIME_STEP * offset
+                tasks.append((house, data, copy, offset, start_timestamp))
+                offset += len(data)
+        outputs = {ap: self._allocate_output(ap, offset) for ap in APPLIANCE_INDICES}
+        parts = self._map(
+            lambda task: self._fill_recombined(outputs, pools, *task), tasks
+        )
+        self._base_timestamp += TIME_STEP * offset
+        for ap, out in outputs.items():
+            self._finalize_output(ap, out, self._merged_stats(parts, ap))
+        print("random activation assignment mode completed.")
+
+    def _balanced_rows(
+        self, appliance: str, data: np.ndarray, bounds: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Source row of every balanced output row of `appliance`, with the
+        activity and number of copies of every window of the concatenated
+        houses `data`. The RNG is seeded by (seed, appliance index).
+        """
+        idx = APPLIANCE_INDICES[appliance]
+        with PROFILER.stage("balance", appliance=appliance) as record:
+            starts, lengths, active = active_windows(
+                data[:, idx],
+                bounds,
+                self._balance["window_rows"],
+                self._balance["min_active_rows"],
+            )
+            rng = np.random.default_rng([self._seed, idx])
+            copies = balance_copies(rng, active, self._balance["active_ratio"])
+            source = window_rows_index(starts, lengths, copies)
+            record["rows"] = len(source)
+        return source, active, copies
+
+    def _fill_balanced(
+        self,
+        out: np.ndarray,
+        appliance: str,
+        data: np.ndarray,
+        source: np.ndarray,
+        start_timestamp: float,
+    ) -> Dict[str, ChannelStats]:
+        """
+        Gather the `source` rows of `data` into `out`, `TRANSFORM_CHUNK_ROWS`
+        rows at a time. Returns the statistics of the rows gathered.
+        """
+        stats: Dict[str, ChannelStats] = {}
+        idx = APPLIANCE_INDICES[appliance]
+        with PROFILER.stage("gather", appliance=appliance, rows=len(source)):
+            for begin in range(0, len(source), TRANSFORM_CHUNK_ROWS):
+                rows = source[begin : begin + TRANSFORM_CHUNK_ROWS]
+                end = begin + len(rows)
+                timestamps = timestamp_ramp(start_timestamp, begin, len(rows))
+                out[begin:end, 0] = timestamps[:, np.newaxis]
+                out[begin:end, 1] = data[rows, 1]
+                out[begin:end, 2] = data[rows, idx]
+                self._chunk_stats(stats, appliance, out[begin:end])
+        return stats
+
+    def mode_balanced(self) -> None:
+        """
+        Class-balanced sampling: every house appears once, split into whole
+        windows, and only the windows where the appliance is active are
+        repeated, until they are `active_ratio` times as many as the idle
+        ones. Each appliance output is balanced on its own, so their lengths
+        differ.
+        """
+        print("Running balanced mode...")
+        houses = self._load_all(self._house_files)
+        with PROFILER.stage("concatenate"):
+            data = np.concatenate(list(houses.values()))
+        bounds = np.concatenate(([0], np.cumsum([len(h) for h in houses.values()])))
+        plans = dict(
+            zip(
+                APPLIANCE_INDICES,
+                self._map(
+                    lambda ap: self._balanced_rows(ap, data, bounds), APPLIANCE_INDICES
+                ),
+            )
+        )
+        outputs = {}
+        for ap, (source, active, copies) in plans.items():
+            print(
+                f"{ap}: {active.sum()} active and {(~active).sum()} idle windows, "
+                f"{(copies - 1).sum()} active windows added."
+            )
+            outputs[ap] = self._allocate_output(ap, len(source))
+        parts = self._map(
+            lambda ap: self._fill_balanced(
+                outputs[ap], ap, data, plans[ap][0], self._base_timestamp
+            ),
+            APPLIANCE_INDICES,
+        )
+        self._base_timestamp += TIME_STEP * max(len(out) for out in outputs.values())
+        for ap, out in outputs.items():
+            self._finalize_output(ap, out, self._merged_stats(parts, ap))
+        print("balanced mode completed.")
+
+
+def check_inputs(aggregator: DataAggregator, with_synthetic: bool, policy: str) -> None:
+    """
+    Check the inputs of `aggregator`, warning or exiting (`policy` "warn" or
+    "fail") if any fails.
+    """
+    if aggregator.check_inputs(with_synthetic):
+        return
+    if policy == "fail":
+        raise SystemExit("Input integrity check failed.")
+    print("Warning: input files failed the integrity check.")
+
+
+def window_config_path(eval_mode: str, mode: str) -> Path:
+    """
+    conf/config*.json that scripts/train.sh copies for `eval_mode` and `mode`.
+    """
+    split = 1 if eval_mode == "hard_eval" else 2
+    variant = (
+        1
+        if mode in ("no_args", "random_assign", "raa", "signal_transform", "balanced")
+        else 2
+    )
+    return CONF_PATH.joinpath(f"./config{split}_{variant}.json")
+
+
+def windows_path(output_path: Path) -> Path:
+    return output_path.with_name(f"{output_path.stem}_windows.npy")
+
+
+def export_training_windows(
+    outputs: Dict[str, Path], config_path: Path, stride: Optional[int] = None
+) -> None:
+    """
+    Export the windows of every appliance output as a normalized float32
+    tensor, using `sample_size` and `feature_normalization` of `config_path`.
+    Windows start every `stride` rows (default: `sample_size`, no overlap).
+    """
+    config = load_window_config(config_path)
+    stride = stride or config["sample_size"]
+    for appliance, path in outputs.items():
+        out_path = windows_path(path)
+        with PROFILER.stage("export", appliance=appliance) as record:
+            windows = export_windows(
+                load_array(path),
+                out_path,
+                config["sample_size"],
+                stride,
+                config["feature_normalization"],
+                appliance=appliance,
+                source=path.name,
+                depth=config["depth"],
+                config=config_path.name,
+            )
+            record["bytes_written"] = file_bytes(out_path)
+        print(f"{appliance} windows shape: {windows.shape}")
+
+
+def emit_normalized_config(stats_path: Path, template: Path, out_path: Path) -> Path:
+    """
+    Write `template` to `out_path` with the feature_normalization of the
+    statistics sidecar `stats_path`.
+    """
+    with open(stats_path) as f:
+        normalization = json.load(f)["feature_normalization"]
+    emit_config(template, out_path, normalization)
+    print(f"Wrote {out_path} with feature_normalization {normalization}.")
+    return out_path
+
+
+def generate_all(
+    output_root: Path,
+    export: bool = False,
+    stride: Optional[int] = None,
+    window_config: Optional[Path] = None,
+    plan: Optional[str] = None,
+    budget: Optional[int] = None,
+    norm_percentile: Optional[float] = None,
+    config_name: Optional[str] = None,
+    check: Optional[str] = None,
+    **options,
+) -> None:
+    """
+    Write every mode of both eval splits to `output_root`/<split>/<mode>/,
+    loading each house and synthetic file, or generating each synthetic
+    appliance, only once. `options` are passed
+    to every DataAggregator. If `plan`, the repeat factors of each split are
+    planned with that objective and row `budget`. Statistics are normalized
+    at `norm_percentile` and, if `config_name`, a config.json of that name
+    with their feature_normalization is written next to every output. If
+    `check` ("warn" or "fail"), the inputs of each split are checked first.
+    If `export`, also export the training windows of every output.
+    """
+    splits = {
+        "hard_eval": (HOUSE_FILES_HARD, FACTOR_BY_HOUSE_HARD),
+        "simple_eval": (HOUSE_FILES_SIMPLE, FACTOR_BY_HOUSE_SIMPLE),
+    }
+    loaded: Dict[Path, np.ndarray] = {}
+    generated: Dict[Tuple[str, int, int], np.ndarray] = {}
+    for eval_mode, (house_files, repeat_factor) in splits.items():
+        if plan is not None:
+            planner = DataAggregator(house_files, {}, loaded=loaded, **options)
+            repeat_factor = planner.plan_repeats(plan, budget)
+            print(f"Planned {eval_mode} repeat factors: {repeat_factor}")
+        if check is not None:
+            checker = DataAggregator(
+                house_files, {}, loaded=loaded, generated=generated, **options
+            )
+            check_inputs(checker, with_synthetic=True, policy=check)
+        for mode, method in MODE_METHODS.items():
+            print(f"Running {mode} in {eval_mode} mode.")
+            out_dir = output_root.joinpath(eval_mode, mode)
+            aggregator = DataAggregator(
+                house_files,
+                repeat_factor,
+                output_files={ap: out_dir / p.name for ap, p in OUTPUT_FILES.items()},
+                loaded=loaded,
+                generated=generated,
+                **options,
+            )
+            getattr(aggregator, method)()
+            if options.get("stats"):
+                aggregator.write_stats(norm_percentile)
+            config_path = window_config or window_config_path(eval_mode, mode)
+            if config_name is not None:
+                config_path = emit_normalized_config(
+                    aggregator.stats_path(), config_path, out_dir / config_name
+                )
+            if export:
+                export_training_windows(aggregator.output_paths(), config_path, stride)
+
 
 def get_args() -> Namespace:
     parser = ArgumentParser(
@@ -218,29 +1581,366 @@ def get_args() -> Namespace:
     parser.add_argument(
         "--merged", action="store_true", help="Apply both synthetic and random assign."
     )
+    parser.add_argument(
+        "--raa",
+        action="store_true",
+        help="Recombine appliance activations at random into new house timelines "
+        "(random appliance activation assignment).",
+    )
+    parser.add_argument(
+        "--signal_transform",
+        action="store_true",
+        help="Repeat houses with time warping, scaling, noise and clipping applied "
+        "to every copy after the first.",
+    )
+    parser.add_argument(
+        "--noise_std",
+        type=float,
+        default=DEFAULT_TRANSFORMS["noise_std"],
+        help="Std (W) of the Gaussian noise added to the aggregate by signal_transform.",
+    )
+    parser.add_argument(
+        "--scale_spread",
+        type=float,
+        default=DEFAULT_TRANSFORMS["scale_spread"],
+        help="signal_transform scales chunks by a factor in [1 - spread, 1 + spread].",
+    )
+    parser.add_argument(
+        "--warp_spread",
+        type=float,
+        default=DEFAULT_TRANSFORMS["warp_spread"],
+        help="signal_transform stretches chunks in time by a factor in "
+        "[1 - spread, 1 + spread].",
+    )
+    parser.add_argument(
+        "--max_power",
+        type=float,
+        default=DEFAULT_TRANSFORMS["max_power"],
+        help="signal_transform clips power channels to this value (W).",
+    )
+    parser.add_argument(
+        "--balanced",
+        action="store_true",
+        help="Keep every house once and oversample only the windows where each "
+        "appliance is active, up to --active_ratio.",
+    )
+    parser.add_argument(
+        "--active_ratio",
+        type=float,
+        default=DEFAULT_BALANCE["active_ratio"],
+        help="Active windows that balanced mode writes per idle window.",
+    )
+    parser.add_argument(
+        "--balance_window",
+        type=int,
+        default=DEFAULT_BALANCE["window_rows"],
+        help="Rows per window classified as active or idle by balanced mode.",
+    )
+    parser.add_argument(
+        "--min_active_rows",
+        type=int,
+        default=DEFAULT_BALANCE["min_active_rows"],
+        help="Rows above the activation threshold that make a window active.",
+    )
+    parser.add_argument(
+        "--plan",
+        choices=PLAN_OBJECTIVES,
+        default=None,
+        help="Compute the repeat factors from the house row counts (rows) or "
+        "appliance activity (balance) instead of using the predefined ones.",
+    )
+    parser.add_argument(
+        "--row_budget",
+        type=int,
+        default=None,
+        help="Output rows per appliance the planned repeat factors should fill; "
+        "if unset, the smallest factor is 1.",
+    )
+    parser.add_argument(
+        "--shared_cache",
+        action="store_true",
+        help="Share loaded house arrays with concurrent runs through shared memory.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Prefetch houses and write the outputs in background threads while "
+        "the next house is transformed (npy and chunked formats only).",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Collect per-channel statistics of the outputs while writing them "
+        f"and save them to {FEATURE_STATS_FILE} next to the outputs.",
+    )
+    parser.add_argument(
+        "--emit_config",
+        type=Path,
+        default=None,
+        help="Write a config.json with the feature_normalization implied by the "
+        "statistics (implies --stats) to this path; with --all, to a file of this "
+        "name next to the outputs of every mode.",
+    )
+    parser.add_argument(
+        "--norm_percentile",
+        type=float,
+        default=None,
+        help="Derive feature_normalization from this percentile instead of the max.",
+    )
+    parser.add_argument(
+        "--check_inputs",
+        nargs="?",
+        choices=("warn", "fail"),
+        const="warn",
+        default=None,
+        help="Check the input files for NaNs, non-monotonic timestamps, negative "
+        "power and appliances exceeding the aggregate before aggregating; warn or "
+        "fail on violations.",
+    )
+    parser.add_argument(
+        "--resample",
+        action="store_true",
+        help="Resample the house recordings onto the 60 s grid before aggregating, "
+        "splitting them at long gaps so that no training window spans one.",
+    )
+    parser.add_argument(
+        "--max_gap",
+        type=int,
+        default=MAX_GAP_ROWS,
+        help="Longest gap (in missing 60 s rows) filled by interpolation when "
+        "resampling.",
+    )
     parser.add_argument(
         "--simple_eval", action="store_true", help="Use data from five eval houses."
     )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help=f"Generate every mode of both eval splits under {ALL_MODES_PATH}, "
+        "loading each input once (bypasses the cache).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=STORAGE_FORMATS,
+        default="pickle",
+        help="Storage format of the output files (npy files can be memory-mapped, "
+        "compact files keep float32 power columns and implicit timestamps, "
+        "chunked files compress every sample_size window on its own).",
+    )
+    parser.add_argument(
+        "--codec",
+        choices=list(CHUNK_CODECS),
+        default="zlib",
+        help="Compression codec of the chunked format.",
+    )
+    parser.add_argument(
+        "--max_memory",
+        type=int,
+        default=None,
+        help="Write houses straight into preallocated outputs, in chunks bounded "
+        "by this memory budget in MB.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Threads used to load and expand houses in parallel.",
+    )
+    parser.add_argument(
+        "--synthetic_days",
+        type=int,
+        default=None,
+        help="Generate this many days of synthetic appliance data instead of "
+        "replaying the files under data/casa_simulada/.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic data generator.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Append only the rows added to the house files since the last "
+        "incremental run of the same mode (bypasses the cache).",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Always regenerate the outputs instead of restoring them from the cache.",
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=float,
+        default=50,
+        help="Size in GB above which least recently used cache entries are evicted.",
+    )
+    parser.add_argument(
+        "--export_windows",
+        action="store_true",
+        help="Also write each output as a normalized float32 (n_windows, "
+        "sample_size, 4) tensor with a JSON manifest, next to the output.",
+    )
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=None,
+        help="Rows between the starts of exported windows; sample_size if unset.",
+    )
+    parser.add_argument(
+        "--window_config",
+        type=Path,
+        default=None,
+        help="config.json giving sample_size and feature_normalization of the "
+        "exported windows; if unset, the one scripts/train.sh uses for the mode.",
+    )
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
+def get_mode(args: Namespace) -> str:
+    if args.synthetic_modelling:
+        return "synthetic_modelling"
+    if args.random_assign:
+        return "random_assign"
+    if args.merged:
+        return "merged"
+    if args.raa:
+        return "raa"
+    if args.signal_transform:
+        return "signal_transform"
+    if args.balanced:
+        return "balanced"
+    return "no_args"
+
+
+def cache_inputs(
+    house_files: Dict[str, Path], mode: str, synthetic_days: Optional[int]
+) -> List[Path]:
+    """
+    Files the outputs of `mode` are read from, hashed into the cache key with
+    the code. SYNTHETIC_FILES only count for synthetic modes that read them;
+    generated synthetic data is keyed by synthetic_days and the seed instead.
+    """
+    inputs = [*CACHE_SOURCES, *house_files.values()]
+    if mode in SYNTHETIC_MODES and synthetic_days is None:
+        inputs += SYNTHETIC_FILES.values()
+    return inputs
+
+
 def main() -> None:
     args = get_args()
+    enable_profiling(args)
     eval_mode = "simple_eval" if args.simple_eval else "hard_eval"
     house_files = HOUSE_FILES_SIMPLE if args.simple_eval else HOUSE_FILES_HARD
     repeat_factor = FACTOR_BY_HOUSE_SIMPLE if args.simple_eval else FACTOR_BY_HOUSE_HARD
 
+    mode = get_mode(args)
+    max_memory = args.max_memory * 2**20 if args.max_memory is not None else None
+    transforms = {
+        "noise_std": args.noise_std,
+        "scale_spread": args.scale_spread,
+        "warp_spread": args.warp_spread,
+        "max_power": args.max_power,
+    }
+    balance = {
+        "active_ratio": args.active_ratio,
+        "window_rows": args.balance_window,
+        "min_active_rows": args.min_active_rows,
+    }
+    options = {
+        "output_format": args.format,
+        "max_memory": max_memory,
+        "workers": args.workers,
+        "synthetic_days": args.synthetic_days,
+        "seed": args.seed,
+        "codec": args.codec,
+        "transforms": transforms,
+        "balance": balance,
+        "shared": None,
+        "pipeline": args.pipeline,
+        "stats": args.stats or args.emit_config is not None,
+        "resample": None,
+    }
+    if args.resample:
+        options["resample"] = {"max_gap_rows": args.max_gap, "window_rows": SAMPLE_SIZE}
+    if args.shared_cache:
+        options["shared"] = SharedArrayCache()
+        atexit.register(options["shared"].close)
+
+    if args.all:
+        generate_all(
+            ALL_MODES_PATH,
+            args.export_windows,
+            args.stride,
+            args.window_config,
+            args.plan,
+            args.row_budget,
+            args.norm_percentile,
+            args.emit_config.name if args.emit_config is not None else None,
+            args.check_inputs,
+            **options,
+        )
+        return
+
     print(f"Running in {eval_mode} mode.")
 
-    aggregator = DataAggregator(house_files, repeat_factor)
-    if args.synthetic_modelling:
-        aggregator.mode_synthetic_modelling()
-    elif args.random_assign:
-        aggregator.mode_random_assignment()
-    elif args.merged:
-        aggregator.mode_merged()
+    loaded: Dict[Path, np.ndarray] = {}
+    if args.plan is not None:
+        planner = DataAggregator(house_files, {}, loaded=loaded, **options)
+        repeat_factor = planner.plan_repeats(args.plan, args.row_budget)
+        print(f"Planned repeat factors: {repeat_factor}")
+
+    aggregator = DataAggregator(house_files, repeat_factor, loaded=loaded, **options)
+    if args.check_inputs is not None:
+        check_inputs(aggregator, mode in SYNTHETIC_MODES, args.check_inputs)
+    mode_method = getattr(aggregator, MODE_METHODS[mode])
+
+    def run_mode() -> None:
+        if args.incremental:
+            aggregator.update(mode)
+        else:
+            mode_method()
+        if options["stats"]:
+            aggregator.write_stats(args.norm_percentile)
+
+    outputs = aggregator.output_paths()
+    cached = dict(outputs)
+    if options["stats"]:
+        cached[FEATURE_STATS_FILE] = aggregator.stats_path()
+    if args.incremental or args.no_cache:
+        run_mode()
     else:
-        aggregator.mode_default()
+        cache = OutputCache(CACHE_PATH, int(args.cache_size * 2**30))
+        key = cache.key(
+            cache_inputs(house_files, mode, args.synthetic_days),
+            mode=mode,
+            eval_mode=eval_mode,
+            repeat_factor=repeat_factor,
+            output_format=args.format,
+            codec=args.codec,
+            synthetic_days=args.synthetic_days,
+            seed=args.seed,
+            transforms=transforms if mode == "signal_transform" else None,
+            balance=balance if mode == "balanced" else None,
+            stats=options["stats"],
+            norm_percentile=args.norm_percentile,
+            resample=options["resample"],
+        )
+        if cache.restore(key, cached):
+            print(f"Restored {mode} outputs from cache entry {key[:12]}.")
+        else:
+            run_mode()
+            cache.store(key, cached)
+
+    config_path = args.window_config or window_config_path(eval_mode, mode)
+    if args.emit_config is not None:
+        config_path = emit_normalized_config(
+            aggregator.stats_path(), config_path, args.emit_config
+        )
+    if args.export_windows:
+        export_training_windows(outputs, config_path, args.stride)
 
 
 if __name__ == "__main__":
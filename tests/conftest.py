@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# data_aug.py imports utils.* from the repo root, the utils scripts import
+# their siblings directly (they are run as `python3 utils/<script>.py`)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "utils")]
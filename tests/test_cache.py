@@ -0,0 +1,51 @@
+import os
+
+from cache import OutputCache
+
+
+def write(path, size: int) -> None:
+    # Unlinked first, as data_aug does, to leave hard-linked cache entries intact
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def test_restore_after_store(tmp_path):
+    cache = OutputCache(tmp_path / "cache", 10**6)
+    source, output = tmp_path / "house.dat", tmp_path / "out" / "train.dat"
+    write(source, 10)
+    write(output, 100)
+    key = cache.key([source], mode="merged")
+    assert not cache.restore(key, {"train.dat": output})
+    cache.store(key, {"train.dat": output})
+
+    output.unlink()
+    assert cache.restore(key, {"train.dat": output})
+    assert output.read_bytes() == b"x" * 100
+
+
+def test_key_changes_with_inputs_and_params(tmp_path):
+    cache = OutputCache(tmp_path / "cache", 10**6)
+    source = tmp_path / "house.dat"
+    write(source, 10)
+    key = cache.key([source], mode="merged")
+    assert cache.key([source], mode="merged") == key
+    assert cache.key([source], mode="no_args") != key
+    write(source, 20)
+    assert cache.key([source], mode="merged") != key
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = OutputCache(tmp_path / "cache", 250)
+    output = tmp_path / "out" / "train.dat"
+    for i, key in enumerate(("a", "b")):
+        write(output, 100)
+        cache.store(key, {"train.dat": output})
+        os.utime(tmp_path / "cache" / key, (1000 + i, 1000 + i))
+    # Restoring "a" makes "b" the least recently used entry
+    assert cache.restore("a", {"train.dat": output})
+    write(output, 100)
+    cache.store("c", {"train.dat": output})
+
+    assert sorted(e.name for e in (tmp_path / "cache").iterdir()) == ["a", "c"]
+    assert not cache.restore("b", {"train.dat": output})
@@ -0,0 +1,166 @@
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+import data_aug
+from data_aug import OUTPUT_FILES, plan_repeat_factors
+
+
+def stats(rows: int, active_rows: int) -> dict:
+    return {"rows": rows, "active_rows": {"ar_condicionado": active_rows}}
+
+
+def test_balance_keeps_idle_houses_once():
+    houses = {"a": stats(100, 50), "b": stats(100, 0), "c": stats(100, 10)}
+    assert plan_repeat_factors(houses, "balance") == {"a": 1, "b": 1, "c": 5}
+
+
+def test_balance_budget_is_not_spent_on_idle_houses():
+    houses = {"a": stats(100, 50), "b": stats(100, 0), "c": stats(100, 10)}
+    factors = plan_repeat_factors(houses, "balance", budget=2000)
+    assert factors["b"] == 1
+    assert factors["c"] > factors["a"]
+    assert sum(100 * factor for factor in factors.values()) <= 2000
+
+
+def test_balance_without_activity_keeps_every_house_once():
+    houses = {"a": stats(100, 0), "b": stats(300, 0)}
+    assert plan_repeat_factors(houses, "balance", budget=2000) == {"a": 1, "b": 1}
+
+
+def test_rows_factors_are_inverse_to_house_rows():
+    houses = {"a": stats(100, 5), "b": stats(300, 5)}
+    assert plan_repeat_factors(houses, "rows") == {"a": 3, "b": 1}
+
+
+def house(rows: int, seed: int = 0) -> np.ndarray:
+    """
+    (rows, 5, 2) house recording of whole watts, one row per minute.
+    """
+    data = np.random.default_rng(seed).integers(0, 1000, (rows, 5, 2)) * 1.0
+    data[:, 0, :] = 1.6e9 + 60 * np.arange(rows)[:, np.newaxis]
+    return data
+
+
+def write_house(path, data: np.ndarray) -> None:
+    with path.open("wb") as f:
+        pickle.dump(data, f)
+
+
+@pytest.fixture
+def missing_synthetic(tmp_path, monkeypatch):
+    """
+    Point data_aug at two small houses, output and cache paths under
+    `tmp_path`, and synthetic files that do not exist.
+    """
+    houses = {}
+    for i, rows in enumerate((300, 200)):
+        houses[f"casa_{i}"] = tmp_path / f"casa_{i}.dat"
+        write_house(houses[f"casa_{i}"], house(rows, seed=i))
+    monkeypatch.setattr(data_aug, "HOUSE_FILES_HARD", houses)
+    monkeypatch.setattr(data_aug, "FACTOR_BY_HOUSE_HARD", {"casa_0": 2, "casa_1": 3})
+    monkeypatch.setattr(
+        data_aug,
+        "SYNTHETIC_FILES",
+        {ap: tmp_path / "casa_simulada" / f"train_{ap}.dat" for ap in OUTPUT_FILES},
+    )
+    monkeypatch.setattr(
+        data_aug,
+        "OUTPUT_FILES",
+        {ap: tmp_path / "out" / path.name for ap, path in OUTPUT_FILES.items()},
+    )
+    monkeypatch.setattr(data_aug, "CACHE_PATH", tmp_path / "cache")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["--random_assign"], ["--synthetic_modelling", "--synthetic_days", "1"]],
+)
+def test_main_runs_without_synthetic_files(missing_synthetic, monkeypatch, args):
+    monkeypatch.setattr(sys, "argv", ["data_aug.py", *args])
+    data_aug.main()
+    for path in data_aug.OUTPUT_FILES.values():
+        assert path.is_file()
+    # The second run is restored from the cache entry stored by the first
+    data_aug.main()
+    assert len(list((missing_synthetic / "cache").iterdir())) == 1
+
+
+@pytest.mark.parametrize("fmt", data_aug.STORAGE_FORMATS)
+def test_incremental_update_matches_full_run(tmp_path, capsys, fmt):
+    recordings = {"casa_0": house(300), "casa_1": house(200, seed=1)}
+    houses = {name: tmp_path / f"{name}.dat" for name in recordings}
+    repeats = {"casa_0": 2, "casa_1": 3}
+
+    def aggregator(out_dir: str) -> data_aug.DataAggregator:
+        outputs = {
+            ap: tmp_path / out_dir / path.name for ap, path in OUTPUT_FILES.items()
+        }
+        return data_aug.DataAggregator(
+            houses, repeats, output_format=fmt, output_files=outputs
+        )
+
+    # The first update has no state and aggregates the rows recorded so far
+    for name, data in recordings.items():
+        write_house(houses[name], data[: len(data) // 2])
+    aggregator("incremental").update("random_assign")
+    for name, data in recordings.items():
+        write_house(houses[name], data)
+    capsys.readouterr()
+    incremental = aggregator("incremental")
+    incremental.update("random_assign")
+    assert "aggregating all rows" not in capsys.readouterr().out
+    full = aggregator("full")
+    full.mode_random_assignment()
+
+    for ap, path in full.output_paths().items():
+        expected = np.asarray(data_aug.load_array(path))
+        updated = np.asarray(data_aug.load_array(incremental.output_paths()[ap]))
+        # Timestamps continue the ramp; new rows come after all the old ones
+        np.testing.assert_array_equal(updated[:, 0], expected[:, 0])
+        assert (np.diff(updated[:, 0, 0]) == 60).all()
+        np.testing.assert_array_equal(
+            np.sort(updated[:, 1:].reshape(len(updated), -1), axis=0),
+            np.sort(expected[:, 1:].reshape(len(expected), -1), axis=0),
+        )
+
+
+def test_active_windows_leave_out_short_tails():
+    bounds = np.array([0, 250, 370, 470])
+    starts, lengths, _ = data_aug.active_windows(np.zeros((470, 2)), bounds, 100, 1)
+    np.testing.assert_array_equal(starts, [0, 100, 250, 370])
+    assert (lengths == 100).all()
+
+
+def test_balanced_windows_are_aligned(tmp_path):
+    recordings = {"casa_0": house(1000), "casa_1": house(530, seed=1)}
+    houses = {name: tmp_path / f"{name}.dat" for name in recordings}
+    for name, data in recordings.items():
+        write_house(houses[name], data)
+    aggregator = data_aug.DataAggregator(
+        houses,
+        {},
+        output_files={ap: tmp_path / path.name for ap, path in OUTPUT_FILES.items()},
+        balance={"active_ratio": 3.0, "window_rows": 120, "min_active_rows": 1},
+    )
+    aggregator.mode_balanced()
+
+    # Every output window is a whole window of one house, in place in it
+    windows = {
+        (name, start): data[start : start + 120, 1:]
+        for name, data in recordings.items()
+        for start in range(0, len(data) - 119, 120)
+    }
+    for ap, idx in data_aug.APPLIANCE_INDICES.items():
+        out = np.asarray(data_aug.load_array(aggregator.output_paths()[ap]))
+        assert len(out) % 120 == 0
+        for start in range(0, len(out), 120):
+            window = out[start : start + 120, 1:]
+            assert any(
+                (window[:, 0] == source[:, 0]).all()
+                and (window[:, 1] == source[:, idx - 1]).all()
+                for source in windows.values()
+            )
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("tables")
+
+from nilmtk_to_dat import convert_building, meter_key, power_columns
+from storage import load_array
+
+START = pd.Timestamp("2020-01-01", tz="UTC")
+
+
+def meter_table(period: str, n_rows: int, columns: dict) -> pd.DataFrame:
+    """
+    NILMTK meter table: (physical_quantity, type) columns over a UTC index.
+    """
+    index = pd.date_range(START, periods=n_rows, freq=period)
+    frame = pd.DataFrame(
+        {column: np.broadcast_to(values, n_rows) for column, values in columns.items()},
+        index=index,
+        dtype=np.float32,
+    )
+    frame.columns = pd.MultiIndex.from_tuples(
+        frame.columns, names=["physical_quantity", "type"]
+    )
+    return frame
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = tmp_path / "store.h5"
+    n_rows = 2 * 3600 // 3
+    # AMPds-style meter: power columns followed by a cumulative energy counter
+    appliance = meter_table(
+        "3s",
+        n_rows,
+        {
+            ("power", "active"): 1000.0,
+            ("power", "reactive"): 100.0,
+            ("energy", "active"): np.arange(n_rows) * 1e3 + 1e6,
+        },
+    )
+    mains = meter_table("1s", 2 * 3600, {("power", "apparent"): 1500.0})
+    with pd.HDFStore(path, mode="w") as store:
+        store.put(meter_key("1", 1), mains, format="table")
+        store.put(meter_key("1", 5), appliance, format="table")
+    return path
+
+
+def test_power_columns_ignore_energy_counters(store_path):
+    with pd.HDFStore(store_path, mode="r") as store:
+        frame = store.select(meter_key("1", 5), stop=10)
+    active, reactive = power_columns(frame)
+    np.testing.assert_array_equal(active, 1000.0)
+    np.testing.assert_array_equal(reactive, 100.0)
+
+
+def test_power_columns_fall_back_to_apparent(store_path):
+    with pd.HDFStore(store_path, mode="r") as store:
+        frame = store.select(meter_key("1", 1), stop=10)
+    active, reactive = power_columns(frame)
+    np.testing.assert_array_equal(active, 1500.0)
+    np.testing.assert_array_equal(reactive, 0.0)
+
+
+def test_power_columns_without_power_raise():
+    frame = meter_table("1s", 10, {("energy", "active"): 1.0})
+    with pytest.raises(ValueError, match="power"):
+        power_columns(frame)
+
+
+def test_convert_building(store_path, tmp_path):
+    out_path, report = convert_building(
+        store_path, "1", {"mains": [1], "chuveiro": [5]}, tmp_path / "b1_train.dat"
+    )
+    data = np.asarray(load_array(out_path))
+    assert data.shape == (report["rows"], 5, 2)
+    assert report["rows"] >= 119
+    np.testing.assert_array_equal(np.diff(data[:, 0, 0]), 60.0)
+    assert data[0, 0, 0] == START.timestamp()
+    assert (data[:, 1] == [1500.0, 0.0]).all()
+    assert (data[:, 3] == [1000.0, 100.0]).all()
+    np.testing.assert_array_equal(data[:, [2, 4]], 0.0)
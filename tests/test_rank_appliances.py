@@ -0,0 +1,61 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from rank_appliances import format_ranking, rank_building
+from storage import save_array
+
+SCRIPT = Path(__file__).resolve().parents[1] / "utils" / "rank_appliances.py"
+
+
+def house(tmp_path, name: str = "casa_9_train.dat"):
+    data = np.zeros((5000, 5, 2))
+    data[:, 0, 0] = 1.6e9 + 60 * np.arange(5000)
+    data[:, 2, 0] = 100.0
+    data[::2, 3, 0] = 4000.0
+    data[:, 4, 0] = 5.0
+    path = tmp_path / name
+    save_array(path, data, "pickle")
+    return path
+
+
+def test_rank_dat_house(tmp_path):
+    ranking = rank_building(house(tmp_path), "casa_9", "dat", chunk_rows=333)
+    assert [row["meters"] for row in ranking] == [[3], [2], [4]]
+    assert [row["mean_power"] for row in ranking] == [2000.0, 100.0, 5.0]
+    assert np.isclose(ranking[0]["on_fraction"], 0.5, atol=1e-3)
+    assert np.isclose(sum(row["energy_share"] for row in ranking), 1.0)
+
+
+def test_format_ranking_aligns_like_5_appliances():
+    ranking = [
+        {"label": "(5, 1, REDD)", "mean_power": 44.750925},
+        {"label": "(((10, 1, REDD), (20, 1, REDD)),)", "mean_power": 32.614809},
+        {"label": "(9, 1, REDD)", "mean_power": 3.5},
+    ]
+    assert format_ranking("REDD - Building 1", ranking).splitlines() == [
+        "REDD - Building 1",
+        "",
+        "(5, 1, REDD)                         44.750925",
+        "(((10, 1, REDD), (20, 1, REDD)),)    32.614809",
+        "(9, 1, REDD)                          3.500000",
+    ]
+
+
+def test_dat_houses_rank_without_pandas(tmp_path):
+    # pandas is only needed for HDF5 stores
+    code = (
+        "import sys, runpy; sys.modules['pandas'] = None; "
+        f"sys.argv[0] = {str(SCRIPT)!r}; "
+        "runpy.run_path(sys.argv[0], run_name='__main__')"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(house(tmp_path)), "--workers", "1"],
+        capture_output=True,
+        text=True,
+        cwd=SCRIPT.parent,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith("dat -\n\n(3, casa_9_train, dat)")
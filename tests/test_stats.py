@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from stats import ChannelStats, feature_normalization
+from windows import WINDOW_CHANNELS
+
+
+def values(n_rows: int, seed: int = 0) -> np.ndarray:
+    data = np.random.default_rng(seed).gamma(0.5, 400.0, (n_rows, 4))
+    data[: n_rows // 10] = 0.0
+    return data
+
+
+def observed(*chunks: np.ndarray) -> ChannelStats:
+    stats = ChannelStats(WINDOW_CHANNELS)
+    for chunk in chunks:
+        stats.update(chunk)
+    return stats
+
+
+def test_update_matches_numpy():
+    data = values(5000)
+    stats = observed(data[:1234], data[1234:])
+    assert stats.count == len(data)
+    np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+    np.testing.assert_allclose(stats.variance, data.var(axis=0))
+    np.testing.assert_array_equal(stats.min, data.min(axis=0))
+    np.testing.assert_array_equal(stats.max, data.max(axis=0))
+    exact = np.percentile(data, 90.0, axis=0)
+    np.testing.assert_allclose(stats.percentile(90.0), exact, rtol=0.02)
+
+
+def test_merged_halves_equal_one_pass():
+    data = values(5000)
+    merged = observed(data[:3000])
+    merged.merge(observed(data[3000:]))
+    whole = observed(data)
+    assert merged.count == whole.count
+    np.testing.assert_allclose(merged.mean, whole.mean)
+    np.testing.assert_allclose(merged.m2, whole.m2)
+    np.testing.assert_array_equal(merged.min, whole.min)
+    np.testing.assert_array_equal(merged.max, whole.max)
+    np.testing.assert_array_equal(merged.zeros, whole.zeros)
+    assert merged.buckets == whole.buckets
+
+
+def test_merge_rejects_other_channels():
+    with pytest.raises(ValueError):
+        observed(values(10)).merge(ChannelStats(["active", "reactive"]))
+
+
+def test_feature_normalization_rounds_peaks_up_to_powers_of_two():
+    chuveiro, refrigerador = np.zeros((100, 4)), np.zeros((100, 4))
+    # aggregate_active, aggregate_reactive, appliance_active, appliance_reactive
+    chuveiro[0] = [3000.0, 200.0, 5000.0, 100.0]
+    refrigerador[0] = [6000.0, 700.0, 150.0, 40.0]
+    stats = [observed(chuveiro), observed(refrigerador)]
+    assert feature_normalization(stats) == [8192.0, 1024.0]
+
+
+def test_feature_normalization_at_a_percentile_ignores_outliers():
+    data = values(10000)
+    data[0] = 1e6
+    normalization = feature_normalization([observed(data)], percentile=99.0)
+    peak = np.percentile(data, 99.0, axis=0)
+    for kind, (aggregate, appliance) in enumerate(((0, 2), (1, 3))):
+        expected = 2 ** np.ceil(np.log2(max(peak[aggregate], peak[appliance])))
+        assert normalization[kind] == expected
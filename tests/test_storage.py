@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from storage import STORAGE_FORMATS, append_array, format_path, load_array, save_array
+
+START = 1.6e9
+
+
+def rows(n_rows: int, start_row: int = 0, seed: int = 0) -> np.ndarray:
+    """
+    (n_rows, 3, 2) output rows with timestamps continuing from `start_row`.
+    Powers are whole watts so that compact (float32) files load them exactly.
+    """
+    data = np.random.default_rng(seed).integers(0, 5000, (n_rows, 3, 2)) * 1.0
+    data[:, 0, :] = START + 60 * np.arange(start_row, start_row + n_rows)[:, None]
+    return data
+
+
+@pytest.mark.parametrize("fmt", STORAGE_FORMATS)
+def test_append_loads_as_the_concatenation(tmp_path, fmt):
+    path = format_path(tmp_path / "train_chuveiro.dat", fmt)
+    parts = [rows(2000), rows(1000, 2000, seed=1), rows(3, 3000, seed=2)]
+    save_array(path, parts[0], fmt)
+    for part in parts[1:]:
+        append_array(path, part, fmt)
+
+    loaded = np.asarray(load_array(path))
+    np.testing.assert_array_equal(loaded, np.concatenate(parts))
+    assert (np.diff(loaded[:, 0, 0]) == 60).all()
+    assert (loaded[:, 0, 0] == loaded[:, 0, 1]).all()
+
+
+@pytest.mark.parametrize("fmt", STORAGE_FORMATS)
+def test_append_to_an_empty_file(tmp_path, fmt):
+    path = format_path(tmp_path / "train_chuveiro.dat", fmt)
+    save_array(path, rows(0), fmt)
+    append_array(path, rows(1500), fmt)
+    np.testing.assert_array_equal(np.asarray(load_array(path)), rows(1500))
@@ -0,0 +1,26 @@
+import numpy as np
+
+from transforms import clip
+
+
+def chunk() -> np.ndarray:
+    data = np.zeros((3, 3, 2))
+    data[:, 0] = 1.6e9
+    data[:, 1:, 0] = [[-5.0, 100.0], [2000.0, 50.0], [30.0, -1.0]]
+    data[:, 1:, 1] = [[-40.0, 10.0], [3000.0, -800.0], [5.0, 20.0]]
+    return data
+
+
+def test_clip_keeps_negative_reactive_power():
+    (clipped,) = clip(iter([chunk()]), None)
+    assert (clipped[:, 1:, 0] >= 0).all()
+    assert clipped[0, 1, 0] == 0.0 and clipped[2, 2, 0] == 0.0
+    np.testing.assert_array_equal(clipped[:, 1:, 1], chunk()[:, 1:, 1])
+    np.testing.assert_array_equal(clipped[:, 0], chunk()[:, 0])
+
+
+def test_clip_bounds_active_and_reactive_power_at_max_power():
+    (clipped,) = clip(iter([chunk()]), 1000.0)
+    assert clipped[1, 1, 0] == 1000.0 and clipped[1, 1, 1] == 1000.0
+    assert clipped[1, 2, 1] == -800.0
+    np.testing.assert_array_equal(clipped[:, 0], chunk()[:, 0])
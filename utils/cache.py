@@ -0,0 +1,86 @@
+"""
+Content-addressed cache of generated output files.
+
+Entries are directories named after a hash of everything the outputs depend
+on (input file sizes and mtimes plus the generation parameters). Outputs are
+hard-linked into and out of the cache when possible, so hits cost no copy.
+Least recently used entries are evicted once the cache exceeds its size.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _entry_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+
+class OutputCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self._root = root
+        self._max_bytes = max_bytes
+
+    def key(self, inputs: Iterable[Path], **params) -> str:
+        """
+        Hash of `params` and the path, size and mtime of every input file.
+        """
+        files = []
+        for path in inputs:
+            stat = path.stat()
+            files.append([str(path.resolve()), stat.st_size, stat.st_mtime_ns])
+        blob = json.dumps({"inputs": files, "params": params}, sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def restore(self, key: str, outputs: Dict[str, Path]) -> bool:
+        """
+        Link the cached files of `key` onto `outputs`; False on a cache miss.
+        """
+        entry = self._root / key
+        if not all((entry / name).is_file() for name in outputs):
+            return False
+        for name, path in outputs.items():
+            os.makedirs(path.parent, exist_ok=True)
+            _link_or_copy(entry / name, path)
+        now = time.time()
+        os.utime(entry, (now, now))
+        return True
+
+    def store(self, key: str, outputs: Dict[str, Path]) -> None:
+        entry = self._root / key
+        staging = self._root / f".{key}.{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, path in outputs.items():
+            _link_or_copy(path, staging / name)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = [e for e in self._root.iterdir() if e.is_dir() and e.name[0] != "."]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        sizes = {entry: _entry_size(entry) for entry in entries}
+        total = sum(sizes.values())
+        for entry in entries:
+            if total <= self._max_bytes:
+                break
+            print(f"Evicting cache entry {entry.name} ...")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= sizes[entry]
@@ -0,0 +1,76 @@
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import json
+
+from integrity import check_array, format_report, is_valid
+from paths import DATA_PATH, RESULT_PATH
+from profiling import PROFILER, add_profile_arguments, enable_profiling, file_bytes
+from storage import load_array
+
+
+def default_paths() -> List[Path]:
+    """
+    House recordings and the ground truth and predictions of every experiment.
+    """
+    return sorted(DATA_PATH.glob("casa_*/*.dat")) + sorted(
+        RESULT_PATH.glob("*/experiment_*/dat/*.dat")
+    )
+
+
+def check_file(path: Path) -> Dict:
+    with PROFILER.stage("check", path=str(path)) as record:
+        record["bytes_read"] = file_bytes(path)
+        try:
+            data = load_array(path)
+        except Exception as error:
+            return {"rows": 0, "error": f"cannot be read ({error})"}
+        return check_array(data)
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Check house and result .dat files for non-monotonic "
+        "timestamps, NaNs, negative power and appliances exceeding the aggregate.",
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        help="Files to check; if none, data/casa_*/*.dat and "
+        "results/*/experiment_*/dat/*.dat.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Files checked concurrently."
+    )
+    parser.add_argument(
+        "--json", type=Path, default=None, help="Also write the reports here."
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_args()
+    enable_profiling(args)
+    paths = args.paths or default_paths()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        reports = dict(zip(map(str, paths), pool.map(check_file, paths)))
+
+    for name, report in reports.items():
+        print(format_report(name, report))
+    if args.json is not None:
+        with args.json.open("w") as f:
+            json.dump(reports, f, indent=2)
+
+    invalid = [name for name, report in reports.items() if not is_valid(report)]
+    print(f"{len(paths) - len(invalid)} of {len(paths)} files passed.")
+    if invalid:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Layout of the house and appliance arrays, shared by data_aug.py and the
+utils scripts. Plain values only, so that any module can import it.
+"""
+
+# Seconds between consecutive rows (TRAIN_TIME_STEP in conf/residencial*.conf)
+TIME_STEP = 60
+
+# Rows per training window (sample_size in conf/config*.json)
+SAMPLE_SIZE = 1440
+
+# Channel of each appliance in the (rows, 5, 2) house arrays; channel 0 holds
+# the timestamps and channel 1 the aggregate
+APPLIANCE_INDICES = {
+    "ar_condicionado": 2,
+    "chuveiro": 3,
+    "refrigerador": 4,
+}
+
+# Active power (W) above which an appliance is considered on (NILMTK's
+# default on_power_threshold)
+ACTIVATION_THRESHOLD = 10.0
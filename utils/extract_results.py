@@ -5,6 +5,14 @@ from pathlib import Path
 
 import numpy as np
 
+from profiling import (
+    PROFILER,
+    add_profile_arguments,
+    enable_profiling,
+    file_bytes,
+    profiled_read,
+)
+
 # List of subscenario identifiers to collect
 SUBSCENARIOS = [
     "casa_diego",
@@ -74,18 +82,22 @@ def main():
     parser.add_argument(
         "--dir", type=Path, help="Path to directory containing .txt result files"
     )
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    enable_profiling(args)
 
     if not args.dir.is_dir():
         parser.error(f"Path '{args.dir}' is not a directory.")
 
     for txt_file in args.dir.glob("*.txt"):
         print(f"Processing: {txt_file.name}")
-        averages = process_file(txt_file)
+        averages = profiled_read(process_file, txt_file, "parse")
 
         out_path = txt_file.with_suffix(".json")
-        with out_path.open("w") as out_f:
-            json.dump(averages, out_f, indent=2)
+        with PROFILER.stage("save", path=str(out_path)) as record:
+            with out_path.open("w") as out_f:
+                json.dump(averages, out_f, indent=2)
+            record["bytes_written"] = file_bytes(out_path)
         print(f"Written: {out_path.name}\n")
 
 
@@ -0,0 +1,99 @@
+"""
+Integrity checks of house and result `.dat` arrays.
+
+An array of shape (rows, channels, 2) holds timestamps in channel 0, the
+aggregate in channel 1 and appliances in channels 2 to 4 (result files may
+add more, e.g. "Other" in channel 5). Column 0 is active and column 1
+reactive power. `check_array` scans it `CHECK_CHUNK_ROWS` rows at a time and
+counts the rows that violate each check, with the offsets of the first ones:
+
+  * non_finite: a NaN or infinite value in any channel.
+  * non_monotonic: a timestamp not after the previous one.
+  * negative_power: a negative active power in any power channel.
+  * appliances_exceed_aggregate: appliance active power summing to more than
+    the aggregate (plus `SUM_TOLERANCE` W).
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+CHECKS = (
+    "non_finite",
+    "non_monotonic",
+    "negative_power",
+    "appliances_exceed_aggregate",
+)
+
+# Rows checked at once
+CHECK_CHUNK_ROWS = 1 << 16
+
+# Watts by which the appliances may exceed the aggregate (rounding noise)
+SUM_TOLERANCE = 1.0
+
+# Offsets reported per check
+MAX_OFFSETS = 10
+
+# Appliance channels (air conditioner, shower, refrigerator)
+APPLIANCE_CHANNELS = slice(2, 5)
+
+
+def _violations(chunk: np.ndarray, previous: float) -> Dict[str, np.ndarray]:
+    """
+    Boolean mask of the rows of `chunk` failing each check; `previous` is
+    the timestamp of the row before it.
+    """
+    timestamps = chunk[:, 0, 0]
+    active = chunk[:, 1:, 0]
+    checks = {
+        "non_finite": ~np.isfinite(chunk).all(axis=(1, 2)),
+        "non_monotonic": np.diff(timestamps, prepend=previous) <= 0,
+        "negative_power": (active < 0).any(axis=1),
+    }
+    appliances = chunk[:, APPLIANCE_CHANNELS, 0].sum(axis=1)
+    checks["appliances_exceed_aggregate"] = appliances > active[:, 0] + SUM_TOLERANCE
+    return checks
+
+
+def check_array(data: np.ndarray, chunk_rows: int = CHECK_CHUNK_ROWS) -> Dict:
+    """
+    Report of the rows of `data` (any array-like returned by `load_array`)
+    violating each of `CHECKS`: their count and first `MAX_OFFSETS` offsets.
+    """
+    if len(np.shape(data)) != 3 or np.shape(data)[2] != 2:
+        return {"rows": 0, "error": f"unexpected shape {np.shape(data)}"}
+    counts = dict.fromkeys(CHECKS, 0)
+    offsets: Dict[str, List[int]] = {check: [] for check in CHECKS}
+    previous = -np.inf
+    for start in range(0, len(data), chunk_rows):
+        chunk = np.asarray(data[start : start + chunk_rows])
+        for check, mask in _violations(chunk, previous).items():
+            counts[check] += int(np.count_nonzero(mask))
+            missing = MAX_OFFSETS - len(offsets[check])
+            if missing > 0:
+                offsets[check] += (np.flatnonzero(mask)[:missing] + start).tolist()
+        previous = chunk[-1, 0, 0]
+    return {
+        "rows": len(data),
+        "violations": {
+            check: {"count": counts[check], "offsets": offsets[check]}
+            for check in CHECKS
+            if counts[check]
+        },
+    }
+
+
+def is_valid(report: Dict) -> bool:
+    return "error" not in report and not report["violations"]
+
+
+def format_report(name: str, report: Dict) -> str:
+    if "error" in report:
+        return f"{name}: {report['error']}"
+    if not report["violations"]:
+        return f"{name}: {report['rows']} rows OK"
+    lines = [f"{name}: {report['rows']} rows"]
+    for check, found in report["violations"].items():
+        offsets = ", ".join(map(str, found["offsets"]))
+        lines.append(f"  {check}: {found['count']} rows (first at {offsets})")
+    return "\n".join(lines)
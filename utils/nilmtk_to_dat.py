@@ -0,0 +1,218 @@
+"""
+Convert a NILMTK HDF5 store (e.g. AMPds or REDD) into per-house `.dat` files.
+
+Every meter table (/building<N>/elec/meter<M>) is read `CHUNK_ROWS` rows at
+a time through pandas' HDFStore and its active and reactive power averaged
+onto the 60 s grid with bincount, so memory depends on the time span of a
+building and not on the sample rate of its meters. A JSON meter map selects
+the meters summed into the aggregate and into each appliance channel of
+APPLIANCE_INDICES, per building:
+
+    {"1": {"mains": [1, 2], "ar_condicionado": [10, 20], "chuveiro": [5],
+           "refrigerador": [9]}}
+
+Minutes missing from the mains or a mapped meter are dropped, short gaps are
+interpolated (see resample.py) and appliances without meters are left at 0.
+Each building is written to <out_dir>/<prefix>_building<N>/
+<prefix>_building<N>_train.dat in the (rows, 5, 2) layout of data/casa_*,
+buildings being converted in parallel processes.
+"""
+
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import json
+import numpy as np
+import pandas as pd
+
+from constants import APPLIANCE_INDICES, TIME_STEP
+from paths import DATA_PATH
+from profiling import PROFILER, add_profile_arguments, enable_profiling, file_bytes
+from resample import MAX_GAP_ROWS, resample
+from storage import STORAGE_FORMATS, format_path, save_array
+
+# Channel of the aggregate and of each appliance
+CHANNELS = {"mains": 1, **APPLIANCE_INDICES}
+
+# Meter rows read at once
+CHUNK_ROWS = 1 << 20
+
+
+def meter_key(building: str, meter: int) -> str:
+    return f"/building{building}/elec/meter{meter}"
+
+
+def index_seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Unix time in seconds of every row of a meter table chunk, whatever the
+    resolution pandas keeps its index in.
+    """
+    return index.values.astype("datetime64[ns]").view(np.int64) / 1e9
+
+
+def power_columns(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Active (apparent if the meter has no active) and reactive power of a
+    chunk of a meter table; reactive is 0 if the meter does not measure it.
+    Only ("power", type) columns are read, meters such as those of AMPds also
+    holding cumulative ("energy", type) counters.
+    """
+    columns = set(frame.columns)
+    kinds = [kind for kind in ("active", "apparent") if ("power", kind) in columns]
+    if not kinds:
+        raise ValueError(
+            "Meter has no ('power', 'active') or ('power', 'apparent') column, "
+            f"only {list(frame.columns)}."
+        )
+    if ("power", "reactive") in columns:
+        reactive = frame[("power", "reactive")].to_numpy(np.float64)
+    else:
+        reactive = np.zeros(len(frame))
+    return frame[("power", kinds[0])].to_numpy(np.float64), reactive
+
+
+def _grid_bounds(store: pd.HDFStore, keys: List[str]) -> Tuple[int, int]:
+    """
+    First and last grid index covered by any of the meters `keys`.
+    """
+    first, last = [], []
+    for key in keys:
+        n_rows = store.get_storer(key).nrows
+        first.append(index_seconds(store.select(key, start=0, stop=1).index)[0])
+        last.append(
+            index_seconds(store.select(key, start=n_rows - 1, stop=n_rows).index)[0]
+        )
+    return int(np.rint(min(first) / TIME_STEP)), int(np.rint(max(last) / TIME_STEP))
+
+
+def bin_meter(
+    store: pd.HDFStore, key: str, first: int, n_grid: int, chunk_rows: int = CHUNK_ROWS
+) -> np.ndarray:
+    """
+    (n_grid, 2) mean active and reactive power of meter `key` in each 60 s
+    bin from grid index `first` on, NaN where the meter has no reading.
+    """
+    sums = np.zeros((n_grid, 2))
+    counts = np.zeros(n_grid)
+    for frame in store.select(key, chunksize=chunk_rows):
+        index = np.rint(index_seconds(frame.index) / TIME_STEP).astype(np.int64) - first
+        active, reactive = power_columns(frame)
+        valid = np.isfinite(active) & np.isfinite(reactive)
+        valid &= (index >= 0) & (index < n_grid)
+        index = index[valid]
+        counts += np.bincount(index, minlength=n_grid)
+        for column, values in enumerate((active[valid], reactive[valid])):
+            sums[:, column] += np.bincount(index, weights=values, minlength=n_grid)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts[:, np.newaxis]
+
+
+def convert_building(
+    store_path: Path,
+    building: str,
+    meters: Dict[str, List[int]],
+    out_path: Path,
+    output_format: str = "pickle",
+    max_gap_rows: int = MAX_GAP_ROWS,
+) -> Tuple[Path, Dict]:
+    """
+    Write building `building` of the NILMTK store to `out_path` in the
+    (rows, 5, 2) layout, with the `meters` of each channel summed.
+    """
+    if not meters.get("mains"):
+        raise ValueError(f"No mains meters mapped for building {building}.")
+    with PROFILER.stage("convert", building=building) as record:
+        record["bytes_read"] = file_bytes(store_path)
+        with pd.HDFStore(store_path, mode="r") as store:
+            keys = [meter_key(building, m) for ms in meters.values() for m in ms]
+            first, last = _grid_bounds(store, keys)
+            n_grid = last - first + 1
+            data = np.zeros((n_grid, len(CHANNELS) + 1, 2))
+            data[:, 0] = ((first + np.arange(n_grid)) * TIME_STEP)[:, np.newaxis]
+            for channel, meter_ids in meters.items():
+                for meter in meter_ids:
+                    key = meter_key(building, meter)
+                    print(f"Binning building {building} meter {meter} ({channel}) ...")
+                    data[:, CHANNELS[channel]] += bin_meter(store, key, first, n_grid)
+
+        report: Dict = {}
+        data = resample(data, TIME_STEP, max_gap_rows, report=report)
+        out_path = format_path(out_path, output_format)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        save_array(out_path, data, output_format)
+        record.update(report, rows=len(data), bytes_written=file_bytes(out_path))
+    return out_path, {"rows": len(data), **report}
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Convert the buildings of a NILMTK HDF5 store into per-house "
+        ".dat files for data_aug.py.",
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("store", type=Path, help="NILMTK HDF5 store.")
+    parser.add_argument(
+        "--meters",
+        type=Path,
+        required=True,
+        help="JSON map of building number to the meters of mains and of each "
+        "appliance.",
+    )
+    parser.add_argument(
+        "--prefix", default="nilmtk", help="Name prefix of the written houses."
+    )
+    parser.add_argument(
+        "--out_dir", type=Path, default=DATA_PATH, help="Directory of the houses."
+    )
+    parser.add_argument(
+        "--format",
+        choices=STORAGE_FORMATS,
+        default="pickle",
+        help="Storage format of the written files.",
+    )
+    parser.add_argument(
+        "--max_gap",
+        type=int,
+        default=MAX_GAP_ROWS,
+        help="Longest gap (in missing 60 s rows) filled by interpolation.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Buildings converted in parallel."
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_args()
+    enable_profiling(args)
+    with args.meters.open() as f:
+        meter_map: Dict[str, Dict[str, List[int]]] = json.load(f)
+    for building, meters in meter_map.items():
+        unknown = set(meters) - set(CHANNELS)
+        if unknown:
+            raise SystemExit(f"Building {building}: unknown channels {unknown}.")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {}
+        for building, meters in meter_map.items():
+            name = f"{args.prefix}_building{building}"
+            out_path = args.out_dir / name / f"{name}_train.dat"
+            futures[name] = pool.submit(
+                convert_building,
+                args.store,
+                building,
+                meters,
+                out_path,
+                args.format,
+                args.max_gap,
+            )
+        for name, future in futures.items():
+            out_path, report = future.result()
+            print(f"{name}: wrote {out_path} {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 from paths import RESULT_PATH, PLOTS_PATH, CONF_PATH
+from profiling import (
+    add_profile_arguments,
+    enable_profiling,
+    profiled_read,
+    profiled_render,
+)
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -21,6 +27,7 @@ def get_args() -> Namespace:
     parser.add_argument(
         "--simple_eval", action="store_true", help="Use data from five eval houses."
     )
+    add_profile_arguments(parser)
 
     return parser.parse_args()
 
@@ -35,17 +42,18 @@ def plot_bar_chart(data: pd.DataFrame, output_file) -> None:
     plt.xlabel("Experiment")
     plt.ylim(0, 100)
     plt.legend(loc="upper left")
-    plt.savefig(output_file, dpi=300, bbox_inches="tight")
+    profiled_render(plt.savefig, output_file, dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main() -> None:
     args = get_args()
+    enable_profiling(args)
     mode = "simple_eval" if args.simple_eval else "hard_eval"
     input_file = RESULT_PATH / mode / "average_acc.csv"
     output_file = PLOTS_PATH / f"eval_average_acc_{mode}.png"
 
-    data = pd.read_csv(input_file)
+    data = profiled_read(pd.read_csv, input_file, "parse")
     data["Acuracia"] = data["Acuracia"].round(1)
 
     plot_bar_chart(data, output_file)
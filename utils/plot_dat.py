@@ -1,7 +1,8 @@
-import pickle
 import matplotlib.pyplot as plt
 import seaborn as sns
 from paths import CONF_PATH
+from profiling import parse_profile_args, profiled_read
+from storage import load_array
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -19,11 +20,9 @@ fig_width = 441.0 * pt
 PLOT_FIGSIZE = (fig_width, fig_width / golden)
 
 
-# Load data from pickle file
+# Load data from pickle or memory-mapped npy file
 def load_data(file_path):
-    with open(file_path, "rb") as file:
-        data = pickle.load(file)
-    return data
+    return load_array(file_path)
 
 
 # Plotting the data
@@ -48,7 +47,8 @@ def plot_data(arr):
 
 
 def main():
-    arr = load_data(INPUT_FILE_PATH)
+    parse_profile_args("Plot the active and reactive power of an aggregated file.")
+    arr = profiled_read(load_data, INPUT_FILE_PATH)
     print(f"Data Shape: {arr.shape}")
     plot_data(arr)
 
@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import gaussian_kde
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -57,7 +58,7 @@ def plot_density(input_files, output_file):
 
     # Load and process all data
     for title, file_path in input_files.items():
-        bin_data = load_data(file_path)
+        bin_data = profiled_read(load_data, file_path, "parse")
         samples = extract_samples_from_bins(bin_data)
         processed_data[title] = samples
         all_samples.extend(samples)
@@ -116,11 +117,12 @@ def plot_density(input_files, output_file):
         va="center",
         rotation="vertical",
     )
-    fig.savefig(output_file.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(fig.savefig, output_file.as_posix(), dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main():
+    parse_profile_args("Plot the kernel weight density of every experiment.")
     plot_density(input_files=INPUT_FILES, output_file=PLOTS_PATH / "density_kernel.png")
 
 
@@ -1,8 +1,10 @@
-import pickle
-
 import matplotlib.pyplot as plt
 import seaborn as sns
 from paths import RESULT_PATH, PLOTS_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
+from storage import load_array
+
+parse_profile_args("Plot an example of disaggregation.")
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -15,14 +17,11 @@ golden = (1 + 5**0.5) / 2
 fig_width = 441.0 * pt
 PLOT_FIGSIZE = (fig_width, fig_width / golden)
 
-file = open(
-    RESULT_PATH.joinpath(
-        "./hard_eval/experiment_merged_run3/dat/casa_andrey_predicted.dat"
-    ).as_posix(),
-    "rb",
+INPUT_FILE = RESULT_PATH.joinpath(
+    "./hard_eval/experiment_merged_run3/dat/casa_andrey_predicted.dat"
 )
 
-arr = pickle.load(file)
+arr = profiled_read(load_array, INPUT_FILE)
 
 max_value = arr[9500:10000, 1, 0].max() + (arr[9500:10000, 1, 0].max()) * 0.1
 
@@ -59,5 +58,5 @@ plt.text(
 )
 
 plt.tight_layout()
-plt.savefig(OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
+profiled_render(plt.savefig, OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
 plt.close()
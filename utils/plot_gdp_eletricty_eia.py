@@ -2,6 +2,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 from paths import PLOTS_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_render
+
+parse_profile_args("Plot the GDP and electricity generation growth projections.")
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -164,5 +167,5 @@ for ind, label in enumerate(line_plot.get_xticklabels()):
 
 line_plot.axvline(x="2022", ymin=0, ymax=1, color="black")
 plt.legend(loc="upper center", frameon=True)
-plt.savefig(OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
+profiled_render(plt.savefig, OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
 plt.close()
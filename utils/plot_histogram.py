@@ -6,6 +6,7 @@ from matplotlib.transforms import Bbox
 import seaborn as sns
 
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -53,7 +54,7 @@ def plot_histograms(input_files: List[Path], output_file: Path):
 
     # Load and process all data
     for title, file_path in input_files.items():
-        bin_data = load_data(file_path)
+        bin_data = profiled_read(load_data, file_path, "parse")
         bin_centers, values = process_bin_data(bin_data)
         processed_data[title] = (bin_centers, values)
         all_x.extend(bin_centers)
@@ -93,11 +94,12 @@ def plot_histograms(input_files: List[Path], output_file: Path):
         va="center",
         rotation="vertical",
     )
-    fig.savefig(output_file.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(fig.savefig, output_file.as_posix(), dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main():
+    parse_profile_args("Plot the kernel weight histogram of every experiment.")
     plot_histograms(
         input_files=INPUT_FILES, output_file=PLOTS_PATH / "histogram_kernel.png"
     )
@@ -1,10 +1,16 @@
-import pickle
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import pandas as pd
 from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import (
+    add_profile_arguments,
+    enable_profiling,
+    profiled_read,
+    profiled_render,
+)
+from storage import load_array
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -18,23 +24,21 @@ PLOT_FIGSIZE = (fig_width, fig_width / golden)
 
 def plot_consumption(house: str, day: int, eval_mode: str) -> None:
     # Load ground truth
-    with open(
+    arr_gt = profiled_read(
+        load_array,
         RESULT_PATH / f"{eval_mode}/experiment_merged_run3/dat/casa_{house}.dat",
-        "rb",
-    ) as f:
-        arr_gt = pickle.load(f)
+    )
 
     # Load predictions
     def load_pred(exp: str):
         path = RESULT_PATH / f"{eval_mode}/{exp}/dat/casa_{house}_predicted.dat"
-        with open(path, "rb") as f:
-            return pickle.load(f)
+        return profiled_read(load_array, path)
 
     arrays = [
         load_pred("experiment_no_args_run3"),
         load_pred("experiment_random_assign_run3"),
         load_pred("experiment_synthetic_modelling_run3"),
-        load_pred("experiment_merged_run3")
+        load_pred("experiment_merged_run3"),
     ]
     labels = ["A", "B", "C", "D"]
 
@@ -96,7 +100,9 @@ def plot_consumption(house: str, day: int, eval_mode: str) -> None:
         # )
 
         plot_name = f"predictions_{house}_{eval_mode}_{index_labels[idx].replace(' ', '_').lower()}.png"
-        plt.savefig(PLOTS_PATH / plot_name, dpi=300, bbox_inches="tight")
+        profiled_render(
+            plt.savefig, PLOTS_PATH / plot_name, dpi=300, bbox_inches="tight"
+        )
         plt.close()
 
 
@@ -113,11 +119,13 @@ def get_args() -> Namespace:
         "--house", type=str, default="andrey", help="House name (default: 'andrey')"
     )
     parser.add_argument("--day", type=int, default=1, help="Day number (default: 1)")
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
 def main() -> None:
     args = get_args()
+    enable_profiling(args)
     eval_mode = "simple_eval" if args.simple_eval else "hard_eval"
     plot_consumption(args.house, args.day, eval_mode)
 
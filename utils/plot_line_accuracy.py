@@ -4,6 +4,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -37,18 +38,19 @@ def plot_overlapped_lines(input_files: List[Path], output_file: Path):
     colors = sns.color_palette("muted", n_colors=len(input_files))
 
     for (title, file_path), color in zip(input_files.items(), colors):
-        df = pd.read_csv(file_path)
+        df = profiled_read(pd.read_csv, file_path, "parse")
         plt.plot(df["Step"], df["Value"], label=title, color=color, linewidth=1.1)
 
     plt.xlabel("Epochs")
     plt.ylabel("Estimated Accuracy")
     plt.ylim(0.5, 1)
     plt.legend(title="Experiments", loc="lower right")
-    plt.savefig(output_file.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(plt.savefig, output_file.as_posix(), dpi=300, bbox_inches="tight")
     plt.close
 
 
 def main():
+    parse_profile_args("Plot the training accuracy of every experiment.")
     plot_overlapped_lines(input_files=INPUT_FILES, output_file=OUTPUT_FILE)
 
 
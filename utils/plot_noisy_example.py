@@ -1,21 +1,20 @@
-import pickle
-
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from statsmodels.nonparametric.smoothers_lowess import lowess
 
 from paths import RESULT_PATH, PLOTS_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
+from storage import load_array
+
+parse_profile_args("Plot an example of noise insertion.")
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
 plt.style.use(style_path)
 
-file = open(
-    RESULT_PATH.joinpath(
-        "./hard_eval/experiment_merged_run3/dat/casa_andrey_predicted.dat"
-    ).as_posix(),
-    "rb",
+INPUT_FILE = RESULT_PATH.joinpath(
+    "./hard_eval/experiment_merged_run3/dat/casa_andrey_predicted.dat"
 )
 
 pt = 1.0 / 72.27
@@ -25,7 +24,7 @@ PLOT_FIGSIZE = (fig_width, fig_width / golden)
 
 OUTPUT_FILE = PLOTS_PATH / "noisy_example.png"
 
-arr = pickle.load(file)
+arr = profiled_read(load_array, INPUT_FILE)
 arr_size = arr[9500:10000, 4, 0].shape[0]
 
 max_value = arr[9500:10000, 4, 0].max() + (arr[9500:10000, 4, 0].max()) * 0.1
@@ -67,5 +66,5 @@ plt.text(
     },
 )
 
-plt.savefig(OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
+profiled_render(plt.savefig, OUTPUT_FILE.as_posix(), dpi=300, bbox_inches="tight")
 plt.close()
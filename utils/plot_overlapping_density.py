@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import gaussian_kde
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_read, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -65,7 +66,7 @@ def plot_density(input_files, output_file, normalize=True, logscale=False):
 
     # Load and expand data
     for title, file_path in input_files.items():
-        bin_data = load_data(file_path)
+        bin_data = profiled_read(load_data, file_path, "parse")
         samples = expand_bin_data(bin_data)
         sample_sets[title] = np.array(samples)
         all_samples.extend(samples)
@@ -99,11 +100,14 @@ def plot_density(input_files, output_file, normalize=True, logscale=False):
     ax.set_xlabel("Kernel Weights")
     ax.legend(title="Experiments", loc="upper left")
 
-    fig.savefig(output_file.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(fig.savefig, output_file.as_posix(), dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main():
+    parse_profile_args(
+        "Plot the overlapping kernel weight densities of the experiments."
+    )
     plot_density(
         input_files=INPUT_FILES,
         output_file=PLOTS_PATH / "overlapping_density_kernel_non_normalized.png",
@@ -2,6 +2,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from paths import PLOTS_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -42,11 +43,12 @@ def create_distribution_plot(years, counts, trendline, width, output_path):
     ax.set_ylabel("Articles")
     ax.yaxis.set_major_locator(plt.MaxNLocator(integer=True))
 
-    plt.savefig(output_path.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(plt.savefig, output_path.as_posix(), dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main():
+    parse_profile_args("Plot the number of data augmentation papers per year.")
     x_numeric = np.arange(len(YEARS))
     trend = compute_trendline(x_numeric, WEIGHT_COUNTS)
     create_distribution_plot(YEARS, WEIGHT_COUNTS, trend, BAR_WIDTH, OUTPUT_FILE)
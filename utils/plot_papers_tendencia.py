@@ -2,6 +2,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 from paths import PLOTS_PATH, CONF_PATH
+from profiling import parse_profile_args, profiled_render
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -64,11 +65,12 @@ def create_stacked_bar_plot(years, weight_counts, width, output_path):
     ax.set_ylabel("Articles")
     ax.legend(loc="upper left")
 
-    fig.savefig(output_path.as_posix(), dpi=300, bbox_inches="tight")
+    profiled_render(fig.savefig, output_path.as_posix(), dpi=300, bbox_inches="tight")
     plt.close()
 
 
 def main():
+    parse_profile_args("Plot the data augmentation papers per year and technique.")
     calculate_total_weight(WEIGHT_COUNTS)
     create_stacked_bar_plot(YEARS, WEIGHT_COUNTS, WIDTH, OUTPUT_FILE)
 
@@ -1,4 +1,3 @@
-import pickle
 from matplotlib.lines import Line2D
 import matplotlib.pyplot as plt
 from matplotlib.transforms import Bbox
@@ -7,6 +6,13 @@ import numpy as np
 import pandas as pd
 from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
 from paths import PLOTS_PATH, RESULT_PATH, CONF_PATH
+from profiling import (
+    add_profile_arguments,
+    enable_profiling,
+    profiled_read,
+    profiled_render,
+)
+from storage import load_array
 
 style_path = CONF_PATH / "paper.mplstyle"
 sns.set_theme(style="whitegrid", palette="muted", rc={"axes.edgecolor": "black"})
@@ -20,43 +26,38 @@ PLOT_FIGSIZE = (fig_width, fig_width / golden)
 
 def plot_consumption(house: str, day: int, eval_mode: str) -> None:
     # Load ground truth
-    with open(
+    arr_gt = profiled_read(
+        load_array,
         RESULT_PATH.joinpath(
             f"./{eval_mode}/experiment_merged_run3/dat/casa_{house}.dat"
-        ).as_posix(),
-        "rb",
-    ) as f:
-        arr_gt = pickle.load(f)
+        ),
+    )
 
     # Load predictions
-    with open(
+    arr1 = profiled_read(
+        load_array,
         RESULT_PATH.joinpath(
             f"./{eval_mode}/experiment_no_args_run3/dat/casa_{house}_predicted.dat"
-        ).as_posix(),
-        "rb",
-    ) as f:
-        arr1 = pickle.load(f)
-    with open(
+        ),
+    )
+    arr2 = profiled_read(
+        load_array,
         RESULT_PATH.joinpath(
             f"./{eval_mode}/experiment_random_assign_run3/dat/casa_{house}_predicted.dat"
-        ).as_posix(),
-        "rb",
-    ) as f:
-        arr2 = pickle.load(f)
-    with open(
+        ),
+    )
+    arr3 = profiled_read(
+        load_array,
         RESULT_PATH.joinpath(
             f"./{eval_mode}/experiment_synthetic_modelling_run3/dat/casa_{house}_predicted.dat"
-        ).as_posix(),
-        "rb",
-    ) as f:
-        arr3 = pickle.load(f)
-    with open(
+        ),
+    )
+    arr4 = profiled_read(
+        load_array,
         RESULT_PATH.joinpath(
             f"./{eval_mode}/experiment_merged_run3/dat/casa_{house}_predicted.dat"
-        ).as_posix(),
-        "rb",
-    ) as f:
-        arr4 = pickle.load(f)
+        ),
+    )
 
     labels = ["A", "B", "C", "D"]
     arrays = [arr1, arr2, arr3, arr4]
@@ -161,7 +162,8 @@ def plot_consumption(house: str, day: int, eval_mode: str) -> None:
         rotation="vertical",
         fontsize=10,
     )
-    fig.savefig(
+    profiled_render(
+        fig.savefig,
         PLOTS_PATH.joinpath(f"./predictions_{house}_{eval_mode}.png").as_posix(),
         dpi=300,
         bbox_inches="tight",
@@ -182,12 +184,14 @@ def get_args() -> Namespace:
         "--house", type=str, default="andrey", help="House name (default: 'andrey')"
     )
     parser.add_argument("--day", type=int, default=1, help="Day number (default: 1)")
+    add_profile_arguments(parser)
 
     return parser.parse_args()
 
 
 def main() -> None:
     args = get_args()
+    enable_profiling(args)
     eval_mode = "simple_eval" if args.simple_eval else "hard_eval"
 
     plot_consumption(args.house, args.day, eval_mode)
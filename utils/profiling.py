@@ -0,0 +1,203 @@
+"""
+Per-stage instrumentation shared by data_aug.py, extract_results.py and the
+plot scripts.
+
+Profiling is off unless a script is run with `--profile [OUTPUT]` or the
+PIPELINE_PROFILE environment variable is set (to 1 or to an output path).
+Every stage then appends one JSON record to the output file (profile.jsonl by
+default) with its wall time and the bytes it read and wrote. Peak traced
+memory is added with `--profile_memory` / PIPELINE_PROFILE_MEMORY=1: to the
+stages that ran while no other stage did (tracemalloc's peak is process-wide,
+so stages overlapping in worker or pipeline threads get none), and to a final
+"run" record covering the whole run. A cProfile dump of the whole run is
+written with `--profile_cprofile PATH` / PIPELINE_PROFILE_CPROFILE=PATH.
+"""
+
+from argparse import ArgumentParser, Namespace
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV = "PIPELINE_PROFILE"
+PROFILE_MEMORY_ENV = "PIPELINE_PROFILE_MEMORY"
+PROFILE_CPROFILE_ENV = "PIPELINE_PROFILE_CPROFILE"
+DEFAULT_OUTPUT = Path("profile.jsonl")
+
+
+def file_bytes(path: Path) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self._output = DEFAULT_OUTPUT
+        self._memory = False
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._lock = threading.Lock()
+        self._script = Path(sys.argv[0]).name
+        # Stages running now, and stages ever started while another one ran
+        self._active = 0
+        self._overlaps = 0
+        # Highest traced memory before the last reset of tracemalloc's peak
+        self._run_peak = 0
+
+    def start(
+        self,
+        output: Path = DEFAULT_OUTPUT,
+        memory: bool = False,
+        cprofile_path: Optional[Path] = None,
+    ) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self._output = Path(output)
+        self._memory = memory
+        if memory:
+            tracemalloc.start()
+            atexit.register(self._write_run_peak)
+        if cprofile_path is not None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+            atexit.register(self._dump_cprofile, Path(cprofile_path))
+
+    def _dump_cprofile(self, path: Path) -> None:
+        self._cprofile.disable()
+        self._cprofile.dump_stats(path)
+
+    def _write_run_peak(self) -> None:
+        peak = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+        self._write({"script": self._script, "stage": "run", "peak_memory_bytes": peak})
+
+    def _enter(self) -> Optional[int]:
+        """
+        Register a starting stage. If no other stage is running, reset the
+        peak of tracemalloc and return the overlap count to check at exit.
+        """
+        with self._lock:
+            self._active += 1
+            if self._active > 1:
+                self._overlaps += 1
+                return None
+            if self._memory:
+                self._run_peak = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            return self._overlaps
+
+    def _exit(self, overlaps: Optional[int]) -> bool:
+        """
+        Unregister a stage; True if it ran alone from start to end.
+        """
+        with self._lock:
+            self._active -= 1
+            return overlaps is not None and overlaps == self._overlaps
+
+    @contextmanager
+    def stage(self, name: str, **fields) -> Iterator[Dict]:
+        """
+        Time the enclosed block as stage `name`. The yielded record can be
+        updated with `bytes_read`/`bytes_written` and any extra fields.
+        """
+        record = {"bytes_read": 0, "bytes_written": 0, **fields}
+        if not self.enabled:
+            yield record
+            return
+        overlaps = self._enter()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - start
+            if self._exit(overlaps) and self._memory:
+                record["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            self._write({"script": self._script, "stage": name, **record})
+
+    def _write(self, record: Dict) -> None:
+        line = json.dumps({"time": time.time(), "pid": os.getpid(), **record})
+        with self._lock, self._output.open("a") as f:
+            f.write(line + "\n")
+
+
+PROFILER = Profiler()
+
+
+def profiled_read(reader: Callable, path, stage: str = "load") -> Any:
+    """
+    `reader(path)`, recorded as `stage` with the size of `path` as bytes read.
+    """
+    with PROFILER.stage(stage, path=str(path)) as record:
+        record["bytes_read"] = file_bytes(path)
+        return reader(path)
+
+
+def profiled_render(save: Callable, path, **kwargs) -> None:
+    """
+    `save(path, **kwargs)` (e.g. `plt.savefig`), recorded as a render stage.
+    """
+    with PROFILER.stage("render", path=str(path)) as record:
+        save(path, **kwargs)
+        record["bytes_written"] = file_bytes(path)
+
+
+def add_profile_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=DEFAULT_OUTPUT,
+        default=None,
+        type=Path,
+        help="Append one JSON record per pipeline stage to this file.",
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Also record the peak traced memory of the run and of every stage "
+        "that ran alone (tracemalloc).",
+    )
+    parser.add_argument(
+        "--profile_cprofile",
+        type=Path,
+        default=None,
+        help="Write a cProfile dump of the whole run to this file.",
+    )
+
+
+def enable_profiling(args: Optional[Namespace] = None) -> None:
+    """
+    Start `PROFILER` if requested through `args` or the environment.
+    """
+    output = getattr(args, "profile", None)
+    env_output = os.environ.get(PROFILE_ENV)
+    if output is None and env_output:
+        output = DEFAULT_OUTPUT if env_output == "1" else Path(env_output)
+    if output is None:
+        return
+    cprofile_path = getattr(args, "profile_cprofile", None)
+    if cprofile_path is None and os.environ.get(PROFILE_CPROFILE_ENV):
+        cprofile_path = Path(os.environ[PROFILE_CPROFILE_ENV])
+    PROFILER.start(
+        output,
+        memory=getattr(args, "profile_memory", False)
+        or os.environ.get(PROFILE_MEMORY_ENV) == "1",
+        cprofile_path=cprofile_path,
+    )
+
+
+def parse_profile_args(description: str) -> Namespace:
+    """
+    Command line of scripts that take no other options than profiling.
+    """
+    parser = ArgumentParser(description=description, allow_abbrev=False)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    enable_profiling(args)
+    return args
@@ -0,0 +1,369 @@
+"""
+Rank the meters of every building by mean power, as in 5_appliances.txt.
+
+Meters are streamed `CHUNK_ROWS` rows at a time, from the /building<N>/elec/
+meter<M> tables of a NILMTK HDF5 store or from the channels 2 on of `.dat`
+houses (every file being a building), and reduced to per-meter totals:
+
+  * count and sum of the active power readings (mean power),
+  * energy, each reading held until the next one for at most
+    `--max_sample_period` seconds,
+  * on-time, the seconds held at `--on_threshold` W or more.
+
+Site meters of the store are skipped and the meters of an appliance measured
+by several meters (e.g. both legs of a 240 V appliance of REDD) are ranked
+together, as listed in the building metadata. A meter's energy share is its
+part of the energy of all ranked meters of the building. Buildings are
+reduced in parallel processes and the top `--top` meters of each are written
+in the format of 5_appliances.txt, e.g.
+
+    REDD - Building 1
+
+    (5, 1, REDD)                         44.750925
+    (((10, 1, REDD), (20, 1, REDD)),)    32.614809
+
+pandas (with PyTables) is only needed to read HDF5 stores.
+"""
+
+from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import json
+import re
+import numpy as np
+
+from constants import ACTIVATION_THRESHOLD
+from profiling import PROFILER, add_profile_arguments, enable_profiling, file_bytes
+from storage import load_array
+
+# Meter rows read at once
+CHUNK_ROWS = 1 << 20
+
+# Longest time (s) a reading is held when integrating energy
+MAX_SAMPLE_PERIOD = 300.0
+
+TOTALS = ("count", "sum", "seconds", "energy", "on_seconds")
+
+HDF_SUFFIXES = (".h5", ".hdf5")
+
+
+def meter_totals(
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+    n_meters: int = 1,
+    on_threshold: float = ACTIVATION_THRESHOLD,
+    max_sample_period: float = MAX_SAMPLE_PERIOD,
+) -> Dict[str, np.ndarray]:
+    """
+    TOTALS of each of the `n_meters` columns of the (timestamps, (rows,
+    n_meters) active power) `chunks`. Non-finite readings are skipped.
+    """
+    totals = {total: np.zeros(n_meters) for total in TOTALS}
+    # Last reading of the previous chunk, held into this one
+    previous = None
+    for timestamps, values in chunks:
+        if not len(values):
+            continue
+        finite = np.isfinite(values)
+        totals["count"] += finite.sum(axis=0)
+        totals["sum"] += np.where(finite, values, 0).sum(axis=0)
+
+        if previous is not None:
+            timestamps = np.concatenate((previous[0], timestamps))
+            values = np.concatenate((previous[1], values))
+        previous = (timestamps[-1:], values[-1:])
+        held = values[:-1]
+        dt = np.clip(np.diff(timestamps), 0, max_sample_period)[:, np.newaxis]
+        dt = np.where(np.isfinite(held), dt, 0)
+        totals["seconds"] += dt.sum(axis=0)
+        totals["energy"] += (np.nan_to_num(held) * dt).sum(axis=0)
+        totals["on_seconds"] += np.where(held >= on_threshold, dt, 0).sum(axis=0)
+    return totals
+
+
+def _hdf_chunks(
+    store: "pd.HDFStore", key: str, chunk_rows: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    from nilmtk_to_dat import index_seconds, power_columns
+
+    for frame in store.select(key, chunksize=chunk_rows):
+        active, _ = power_columns(frame)
+        yield index_seconds(frame.index), active[:, np.newaxis]
+
+
+def _dat_chunks(
+    data: np.ndarray, chunk_rows: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for start in range(0, len(data), chunk_rows):
+        chunk = np.asarray(data[start : start + chunk_rows], dtype=np.float64)
+        yield chunk[:, 0, 0], chunk[:, 2:, 0]
+
+
+def _building_meters(store: "pd.HDFStore", building: str) -> List[List[int]]:
+    """
+    Meters of `building` to rank, those of one appliance grouped, site
+    meters left out.
+    """
+    pattern = re.compile(rf"/building{building}/elec/meter(\d+)$")
+    meters = sorted(int(m[1]) for m in map(pattern.match, store.keys()) if m)
+    try:
+        metadata = store.get_node(f"/building{building}")._v_attrs.metadata
+    except (AttributeError, KeyError):
+        return [[meter] for meter in meters]
+
+    site = {
+        int(meter)
+        for meter, info in metadata.get("elec_meters", {}).items()
+        if info.get("site_meter")
+    }
+    groups = [
+        sorted(appliance["meters"])
+        for appliance in metadata.get("appliances", [])
+        if len(appliance.get("meters", [])) > 1
+    ]
+    grouped = {meter for group in groups for meter in group}
+    singles = [[m] for m in meters if m not in site and m not in grouped]
+    return sorted(singles + groups)
+
+
+def _label(meters: List[int], building: str, dataset: str) -> str:
+    """
+    NILMTK's identifier of a meter, or of the group of an appliance's meters.
+    """
+    ids = [f"({meter}, {building}, {dataset})" for meter in meters]
+    return ids[0] if len(ids) == 1 else f"(({', '.join(ids)}),)"
+
+
+def rank_building(
+    source: Path,
+    building: str,
+    dataset: str,
+    on_threshold: float = ACTIVATION_THRESHOLD,
+    max_sample_period: float = MAX_SAMPLE_PERIOD,
+    chunk_rows: int = CHUNK_ROWS,
+) -> List[Dict]:
+    """
+    Mean power, energy, on-time and energy share of the meters of
+    `building`, ranked by mean power. `source` is a NILMTK store or a `.dat`
+    house (whose meters are its appliance channels).
+    """
+    options = (on_threshold, max_sample_period)
+    with PROFILER.stage("rank", building=building) as record:
+        record["bytes_read"] = file_bytes(source)
+        if source.suffix in HDF_SUFFIXES:
+            import pandas as pd
+            from nilmtk_to_dat import meter_key
+
+            groups, totals = [], []
+            with pd.HDFStore(source, mode="r") as store:
+                for meters in _building_meters(store, building):
+                    groups.append(meters)
+                    parts = [
+                        meter_totals(
+                            _hdf_chunks(store, meter_key(building, m), chunk_rows),
+                            1,
+                            *options,
+                        )
+                        for m in meters
+                    ]
+                    totals.append(
+                        {
+                            # The appliance draws the sum of its meters and is on
+                            # as long as its longest-on meter
+                            "mean": sum(
+                                p["sum"][0] / max(p["count"][0], 1) for p in parts
+                            ),
+                            "energy": sum(p["energy"][0] for p in parts),
+                            "seconds": max(p["seconds"][0] for p in parts),
+                            "on_seconds": max(p["on_seconds"][0] for p in parts),
+                        }
+                    )
+        else:
+            data = load_array(source)
+            n_meters = np.shape(data)[1] - 2
+            reduced = meter_totals(_dat_chunks(data, chunk_rows), n_meters, *options)
+            groups = [[channel] for channel in range(2, n_meters + 2)]
+            means = reduced["sum"] / np.maximum(reduced["count"], 1)
+            totals = [
+                {
+                    "mean": means[i],
+                    "energy": reduced["energy"][i],
+                    "seconds": reduced["seconds"][i],
+                    "on_seconds": reduced["on_seconds"][i],
+                }
+                for i in range(len(groups))
+            ]
+        record["meters"] = len(groups)
+
+    total_energy = sum(part["energy"] for part in totals)
+    ranking = [
+        {
+            "label": _label(meters, building, dataset),
+            "meters": meters,
+            "mean_power": float(part["mean"]),
+            "energy_kwh": float(part["energy"] / 3.6e6),
+            "energy_share": (
+                float(part["energy"] / total_energy) if total_energy else 0.0
+            ),
+            "on_hours": float(part["on_seconds"] / 3600),
+            "on_fraction": (
+                float(part["on_seconds"] / part["seconds"]) if part["seconds"] else 0.0
+            ),
+        }
+        for meters, part in zip(groups, totals)
+    ]
+    return sorted(ranking, key=lambda row: -row["mean_power"])
+
+
+def format_ranking(heading: str, ranking: List[Dict]) -> str:
+    """
+    Block of 5_appliances.txt: `heading`, then the labels and mean power of
+    `ranking` aligned like a printed pandas Series.
+    """
+    labels = [row["label"] for row in ranking]
+    values = [f"{row['mean_power']:.6f}" for row in ranking]
+    label_width = max(map(len, labels), default=0)
+    value_width = max(map(len, values), default=0)
+    lines = [
+        f"{label:<{label_width}}    {value:>{value_width}}"
+        for label, value in zip(labels, values)
+    ]
+    return "\n".join([heading, ""] + lines)
+
+
+def _store_buildings(store_path: Path) -> Tuple[str, List[str]]:
+    """
+    Dataset name (from the store metadata, else the file name) and buildings
+    of a NILMTK store.
+    """
+    import pandas as pd
+
+    with pd.HDFStore(store_path, mode="r") as store:
+        pattern = re.compile(r"/building(\d+)/elec/meter\d+$")
+        buildings = {m[1] for m in map(pattern.match, store.keys()) if m}
+        try:
+            name = store.root._v_attrs.metadata["name"]
+        except (AttributeError, KeyError):
+            name = store_path.stem
+    return name, sorted(buildings, key=int)
+
+
+def get_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Rank the meters of every building of NILMTK HDF5 stores or "
+        ".dat houses by mean power, in the format of 5_appliances.txt.",
+        formatter_class=ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "sources",
+        nargs="+",
+        type=Path,
+        help="A NILMTK HDF5 store (.h5), or .dat houses ranked as the buildings "
+        "of one dataset.",
+    )
+    parser.add_argument(
+        "--buildings",
+        nargs="+",
+        default=None,
+        help="Buildings of the store to rank; all if not given.",
+    )
+    parser.add_argument(
+        "--dataset",
+        default=None,
+        help="Dataset name of the meter labels; the store's, or 'dat' for .dat "
+        "houses, if not given.",
+    )
+    parser.add_argument(
+        "--title",
+        default=None,
+        help="Dataset name of the block headings; --dataset if not given.",
+    )
+    parser.add_argument(
+        "--top", type=int, default=5, help="Meters listed per building."
+    )
+    parser.add_argument(
+        "--on_threshold",
+        type=float,
+        default=ACTIVATION_THRESHOLD,
+        help="Active power (W) from which a meter counts as on.",
+    )
+    parser.add_argument(
+        "--max_sample_period",
+        type=float,
+        default=MAX_SAMPLE_PERIOD,
+        help="Longest time (s) a reading is held when integrating energy.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="File the ranking is appended to (e.g. 5_appliances.txt); printed "
+        "if not given.",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        default=None,
+        help="Also write the full ranking, with energy and on-time, here.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Buildings ranked in parallel."
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = get_args()
+    enable_profiling(args)
+    if args.sources[0].suffix in HDF_SUFFIXES:
+        if len(args.sources) > 1:
+            raise SystemExit("Rank one NILMTK store at a time.")
+        name, buildings = _store_buildings(args.sources[0])
+        tasks = {b: args.sources[0] for b in args.buildings or buildings}
+    else:
+        name = "dat"
+        tasks = {path.stem: path for path in args.sources}
+    dataset = args.dataset or name
+    title = args.title or dataset
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            building: pool.submit(
+                rank_building,
+                source,
+                building,
+                dataset,
+                args.on_threshold,
+                args.max_sample_period,
+            )
+            for building, source in tasks.items()
+        }
+        rankings = {building: future.result() for building, future in futures.items()}
+
+    blocks = []
+    for building, ranking in rankings.items():
+        if len(rankings) == 1:
+            heading = f"{title} -"
+        elif building.isdigit():
+            heading = f"{title} - Building {building}"
+        else:
+            heading = f"{title} - {building}"
+        blocks.append(format_ranking(heading, ranking[: args.top]))
+    table = "\n\n".join(blocks)
+
+    if args.output is None:
+        print(table)
+    else:
+        exists = args.output.exists() and args.output.stat().st_size
+        with args.output.open("a") as f:
+            f.write(("\n" if exists else "") + table + "\n")
+        print(f"Appended {len(blocks)} buildings to {args.output}")
+    if args.json is not None:
+        with args.json.open("w") as f:
+            json.dump({title: rankings}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
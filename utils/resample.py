@@ -0,0 +1,145 @@
+"""
+Gap-aware resampling of house recordings onto the TRAIN_TIME_STEP grid.
+
+Readings are binned onto the absolute `step` second grid by rounding their
+timestamp (channel 0) and averaging the readings of each bin, so 1 Hz
+recordings are downsampled and jittery 60 s recordings are realigned. Rows
+with non-finite values are treated as missing. Gaps of at most
+`max_gap_rows` missing bins are filled by linear interpolation; longer gaps
+split the recording into segments. Every segment is trimmed to a whole number
+of `window_rows` windows (shorter ones are dropped), so that once the
+segments are laid one after another no window of `window_rows` rows spans a
+gap.
+
+The input is read `chunk_rows` rows at a time, so the working memory does
+not depend on the length of the recording.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Longest run of missing bins filled by interpolation
+MAX_GAP_ROWS = 5
+
+# Input rows binned at once
+RESAMPLE_CHUNK_ROWS = 1 << 20
+
+
+def _bin(rows: np.ndarray, step: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grid index and mean power of every bin of the sorted `rows`.
+    """
+    index = np.rint(rows[:, 0, 0] / step).astype(np.int64)
+    starts = np.flatnonzero(np.diff(index, prepend=index[0] - 1))
+    counts = np.diff(np.append(starts, len(rows)))
+    means = np.add.reduceat(rows, starts, axis=0) / counts[:, np.newaxis, np.newaxis]
+    return index[starts], means
+
+
+def _fill(
+    index: np.ndarray, values: np.ndarray, max_gap_rows: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Grid rows from bin 0 (exclusive) to the last bin of `index`/`values`,
+    interpolating gaps of at most `max_gap_rows` bins. Returns the grid index
+    and values of the rows and the positions where a longer gap was skipped.
+    """
+    gap = np.diff(index) - 1
+    short = gap <= max_gap_rows
+    lengths = np.where(short, gap + 1, 1)
+    pair = np.repeat(np.arange(1, len(index)), lengths)
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    grid = np.where(short[pair - 1], index[pair - 1] + 1 + offset, index[pair])
+    weight = (grid - index[pair - 1]) / (index[pair] - index[pair - 1])
+    weight = weight[:, np.newaxis, np.newaxis]
+    filled = values[pair - 1] * (1 - weight) + values[pair] * weight
+    breaks = np.flatnonzero(~short)
+    return grid, filled, (np.cumsum(lengths) - lengths)[breaks]
+
+
+def _grid_runs(
+    data: np.ndarray, step: float, max_gap_rows: int, chunk_rows: int, report: Dict
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Consecutive runs of grid rows of `data`, each with the positions where a
+    gap longer than `max_gap_rows` bins precedes a row.
+    """
+    carry = np.empty((0,) + np.shape(data)[1:])
+    # Grid index and values of the last bin yielded
+    last: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    for start in range(0, len(data), chunk_rows):
+        rows = np.asarray(data[start : start + chunk_rows], dtype=np.float64)
+        valid = np.isfinite(rows).all(axis=(1, 2))
+        report["invalid_rows"] += int(len(rows) - valid.sum())
+        rows = np.concatenate((carry, rows[valid]))
+        if np.any(np.diff(rows[:, 0, 0]) < 0):
+            rows = rows[np.argsort(rows[:, 0, 0], kind="stable")]
+        if start + chunk_rows < len(data) and len(rows):
+            # The readings of the last bin may go on in the next chunk
+            bins = np.rint(rows[:, 0, 0] / step)
+            cut = np.searchsorted(bins, bins[-1])
+            rows, carry = rows[:cut], rows[cut:]
+        if not len(rows):
+            continue
+
+        index, means = _bin(rows, step)
+        if last is None:
+            first_index, first_means = index[:1], means[:1]
+        else:
+            # Readings older than the last bin yielded are dropped
+            later = index > last[0][0]
+            report["invalid_rows"] += int(np.count_nonzero(~later))
+            index = np.concatenate((last[0], index[later]))
+            means = np.concatenate((last[1], means[later]))
+        grid, filled, breaks = _fill(index, means, max_gap_rows)
+        report["interpolated_rows"] += len(grid) - (len(index) - 1)
+        if last is None:
+            grid = np.concatenate((first_index, grid))
+            filled = np.concatenate((first_means, filled))
+            breaks = breaks + 1
+        last = (index[-1:], means[-1:])
+        filled[:, 0] = (grid * step)[:, np.newaxis]
+        yield filled, breaks
+
+
+def resample(
+    data: np.ndarray,
+    step: float = 60,
+    max_gap_rows: int = MAX_GAP_ROWS,
+    window_rows: int = 1,
+    chunk_rows: int = RESAMPLE_CHUNK_ROWS,
+    report: Optional[Dict] = None,
+) -> np.ndarray:
+    """
+    `data` (any (rows, channels, 2) array-like returned by `load_array`)
+    resampled onto the `step` grid, with its gap-free segments trimmed to
+    whole `window_rows` windows and laid one after another. If given,
+    `report` is filled with the number of segments kept and the number of
+    invalid, interpolated and dropped rows.
+    """
+    report = report if report is not None else {}
+    report.update(segments=0, invalid_rows=0, interpolated_rows=0, dropped_rows=0)
+    out: List[np.ndarray] = []
+    # Rows of the current segment that do not fill a window yet
+    pending: List[np.ndarray] = []
+    kept = False
+
+    for rows, breaks in _grid_runs(data, step, max_gap_rows, chunk_rows, report):
+        for i, part in enumerate(np.split(rows, breaks)):
+            if i:
+                report["dropped_rows"] += sum(len(p) for p in pending)
+                report["segments"] += kept
+                pending, kept = [], False
+            pending.append(part)
+            n_rows = sum(len(p) for p in pending)
+            if n_rows >= window_rows:
+                joined = np.concatenate(pending)
+                complete = n_rows - n_rows % window_rows
+                out.append(joined[:complete])
+                pending, kept = [joined[complete:]], True
+    report["dropped_rows"] += sum(len(p) for p in pending)
+    report["segments"] += kept
+    if not out:
+        return np.empty((0,) + np.shape(data)[1:])
+    return np.concatenate(out)
@@ -0,0 +1,189 @@
+"""
+Shared-memory cache of loaded house arrays.
+
+Concurrent data_aug runs on one machine would otherwise each hold a private
+copy of the same house arrays. With this cache, the first process to load a
+file publishes it as a `multiprocessing.shared_memory` block named after the
+path, size and mtime of the file, and later processes attach to the block by
+name without copying. A registry directory holds one JSON file per block with
+its shape, dtype and the ids of the processes using it, guarded by a lock
+file per block. The last process to release a block unlinks it; blocks left
+by processes that died are removed by the next cache that finds them.
+"""
+
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+DEFAULT_REGISTRY = Path(tempfile.gettempdir()) / "data_aug_shm"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _untrack(block: shared_memory.SharedMemory) -> None:
+    # The resource tracker would unlink the block when this process exits,
+    # even while other processes still use it; lifetime is handled here
+    resource_tracker.unregister(block._name, "shared_memory")
+
+
+def _unlink(name: str) -> None:
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+class SharedArrayCache:
+    def __init__(self, registry: Path = DEFAULT_REGISTRY, prefix: str = "data_aug"):
+        self._registry = Path(registry)
+        self._prefix = prefix
+        self._held: Dict[str, shared_memory.SharedMemory] = {}
+        os.makedirs(self._registry, exist_ok=True)
+        self.sweep()
+
+    def __enter__(self) -> "SharedArrayCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def name(self, path: Path, variant: str = "") -> str:
+        """
+        Block name of the current contents of `path`, loaded as `variant`.
+        """
+        stat = Path(path).stat()
+        blob = json.dumps(
+            [str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, variant]
+        )
+        return f"{self._prefix}_{hashlib.sha256(blob.encode()).hexdigest()[:24]}"
+
+    @contextmanager
+    def _locked(self, name: str) -> Iterator[Optional[Dict]]:
+        """
+        Hold the lock of block `name` and yield its registry entry (None if
+        absent), with dead processes removed from its users.
+        """
+        with (self._registry / f"{name}.lock").open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entry_path = self._registry / f"{name}.json"
+            entry = None
+            if entry_path.is_file():
+                entry = json.loads(entry_path.read_text())
+                entry["users"] = {
+                    pid: count
+                    for pid, count in entry["users"].items()
+                    if _alive(int(pid))
+                }
+            yield entry
+
+    def _write_entry(self, name: str, entry: Dict) -> None:
+        entry_path = self._registry / f"{name}.json"
+        staging = entry_path.with_suffix(f".{os.getpid()}")
+        staging.write_text(json.dumps(entry))
+        os.replace(staging, entry_path)
+
+    def _remove_entry(self, name: str) -> None:
+        _unlink(name)
+        (self._registry / f"{name}.json").unlink(missing_ok=True)
+
+    def get(
+        self, path: Path, loader: Callable[[Path], np.ndarray], variant: str = ""
+    ) -> np.ndarray:
+        """
+        Read-only array of `path` in shared memory. Attaches to the block of
+        another process if there is one, else loads it with `loader` and
+        publishes it. Arrays loaded differently from the same file must be
+        given distinct `variant`s.
+        """
+        name = self.name(path, variant)
+        pid = str(os.getpid())
+        with self._locked(name) as entry:
+            block = self._held.get(name)
+            if block is None and entry is not None:
+                try:
+                    block = shared_memory.SharedMemory(name=name)
+                    _untrack(block)
+                except FileNotFoundError:
+                    entry = None
+            if block is None and entry is None:
+                data = np.ascontiguousarray(loader(path))
+                block = shared_memory.SharedMemory(
+                    name=name, create=True, size=max(data.nbytes, 1)
+                )
+                _untrack(block)
+                shared = np.ndarray(data.shape, data.dtype, buffer=block.buf)
+                shared[...] = data
+                entry = {
+                    "path": str(path),
+                    "shape": list(data.shape),
+                    "dtype": data.dtype.str,
+                    "users": {},
+                }
+            if name not in self._held:
+                self._held[name] = block
+                entry["users"][pid] = entry["users"].get(pid, 0) + 1
+                self._write_entry(name, entry)
+
+        array = np.ndarray(
+            tuple(entry["shape"]), np.dtype(entry["dtype"]), buffer=block.buf
+        )
+        array.flags.writeable = False
+        return array
+
+    def release(self, name: str) -> None:
+        """
+        Stop using block `name`, unlinking it if no other process uses it.
+        """
+        block = self._held.pop(name, None)
+        if block is None:
+            return
+        pid = str(os.getpid())
+        with self._locked(name) as entry:
+            if entry is not None:
+                count = entry["users"].pop(pid, 0) - 1
+                if count > 0:
+                    entry["users"][pid] = count
+            if entry is None or not entry["users"]:
+                self._remove_entry(name)
+            else:
+                self._write_entry(name, entry)
+        try:
+            block.close()
+        except BufferError:
+            # Arrays still reference the block; it is unmapped at exit
+            pass
+
+    def close(self) -> None:
+        for name in list(self._held):
+            self.release(name)
+
+    def sweep(self) -> None:
+        """
+        Unlink the blocks whose users have all exited.
+        """
+        for entry_path in self._registry.glob(f"{self._prefix}_*.json"):
+            name = entry_path.stem
+            if name in self._held:
+                continue
+            with self._locked(name) as entry:
+                if entry is not None and not entry["users"]:
+                    print(f"Removing shared house array {name} ...")
+                    self._remove_entry(name)
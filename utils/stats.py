@@ -0,0 +1,209 @@
+"""
+Streaming per-channel statistics of aggregated outputs.
+
+`ChannelStats` is updated with chunks of (rows, channels) power values as
+they are written. It keeps the count, min, max, mean and variance (Welford's
+algorithm, combined per chunk) and a logarithmic histogram sketch with a
+relative accuracy of `SKETCH_ACCURACY`, from which any percentile can be
+estimated. Every part is mergeable, so statistics of separate outputs or of
+rows appended later are combined without another pass over the data.
+
+The statistics of every appliance output are stored in a JSON sidecar, from
+which the `feature_normalization` of the trainer's config.json is derived.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import json
+import numpy as np
+
+# Relative error of the percentiles estimated from the sketch
+SKETCH_ACCURACY = 0.01
+
+# Values below this count as zero in the sketch
+SKETCH_MIN_VALUE = 1e-3
+
+# Percentiles reported in the sidecar summary
+SUMMARY_PERCENTILES = (50.0, 99.0, 99.9)
+
+
+class ChannelStats:
+    def __init__(self, channels: Sequence[str], accuracy: float = SKETCH_ACCURACY):
+        n = len(channels)
+        self.channels = list(channels)
+        self.accuracy = accuracy
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        # Sketch: values at most SKETCH_MIN_VALUE, then counts per bucket
+        # index i holding values in (gamma^(i-1), gamma^i]
+        self.zeros = np.zeros(n, dtype=np.int64)
+        self.buckets: List[Dict[int, int]] = [{} for _ in channels]
+        self._log_gamma = np.log((1 + accuracy) / (1 - accuracy))
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / max(self.count, 1)
+
+    def _combine(self, count: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        # Chan et al. pairwise update of Welford's running mean and M2
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add a (rows, channels) chunk of values.
+        """
+        if not len(values):
+            return
+        mean = values.mean(axis=0)
+        self._combine(len(values), mean, ((values - mean) ** 2).sum(axis=0))
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+
+        positive = values > SKETCH_MIN_VALUE
+        self.zeros += len(values) - positive.sum(axis=0)
+        for channel, buckets in enumerate(self.buckets):
+            column = values[positive[:, channel], channel]
+            if not len(column):
+                continue
+            index = np.ceil(np.log(column) / self._log_gamma).astype(np.int64)
+            first = index.min()
+            counts = np.bincount(index - first)
+            for offset in np.flatnonzero(counts):
+                key = int(first + offset)
+                buckets[key] = buckets.get(key, 0) + int(counts[offset])
+
+    def merge(self, other: "ChannelStats") -> None:
+        if other.channels != self.channels or other.accuracy != self.accuracy:
+            raise ValueError("Only statistics of the same channels can be merged.")
+        if not other.count:
+            return
+        self._combine(other.count, other.mean, other.m2)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.zeros += other.zeros
+        for buckets, other_buckets in zip(self.buckets, other.buckets):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+
+    def percentile(self, q: float) -> np.ndarray:
+        """
+        Estimated `q`th percentile of every channel, within `accuracy`.
+        """
+        out = np.zeros(len(self.channels))
+        gamma = np.exp(self._log_gamma)
+        for channel, buckets in enumerate(self.buckets):
+            rank = q / 100 * (self.count - 1)
+            if rank < self.zeros[channel]:
+                continue
+            seen = self.zeros[channel]
+            for key in sorted(buckets):
+                seen += buckets[key]
+                if seen > rank:
+                    out[channel] = 2 * gamma**key / (gamma + 1)
+                    break
+        return np.minimum(out, self.max)
+
+    def to_dict(self) -> Dict:
+        return {
+            "channels": self.channels,
+            "accuracy": self.accuracy,
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "zeros": self.zeros.tolist(),
+            "buckets": [{str(k): v for k, v in b.items()} for b in self.buckets],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "ChannelStats":
+        stats = cls(state["channels"], state["accuracy"])
+        stats.count = state["count"]
+        for name in ("mean", "m2", "min", "max"):
+            setattr(stats, name, np.asarray(state[name], dtype=np.float64))
+        stats.zeros = np.asarray(state["zeros"], dtype=np.int64)
+        stats.buckets = [{int(k): v for k, v in b.items()} for b in state["buckets"]]
+        return stats
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        percentiles = {q: self.percentile(q) for q in SUMMARY_PERCENTILES}
+        std = np.sqrt(self.variance)
+        return {
+            channel: {
+                "min": float(self.min[i]),
+                "max": float(self.max[i]),
+                "mean": float(self.mean[i]),
+                "std": float(std[i]),
+                **{f"p{q:g}": float(values[i]) for q, values in percentiles.items()},
+            }
+            for i, channel in enumerate(self.channels)
+        }
+
+
+def feature_normalization(
+    stats: Iterable[ChannelStats], percentile: Optional[float] = None
+) -> List[float]:
+    """
+    [active, reactive] normalization covering the aggregate_* and appliance_*
+    channels of all `stats`: their max (or `percentile`), rounded up to a
+    power of two like the hand-set values of conf/config*.json.
+    """
+    stats = list(stats)
+    merged = ChannelStats(stats[0].channels, stats[0].accuracy)
+    for part in stats:
+        merged.merge(part)
+    values = merged.max if percentile is None else merged.percentile(percentile)
+    by_channel = dict(zip(merged.channels, values))
+    normalization = []
+    for kind in ("active", "reactive"):
+        peak = max(by_channel[f"aggregate_{kind}"], by_channel[f"appliance_{kind}"])
+        normalization.append(float(2 ** np.ceil(np.log2(max(peak, 1.0)))))
+    return normalization
+
+
+def save_stats(
+    path: Path, stats: Dict[str, ChannelStats], percentile: Optional[float] = None
+) -> None:
+    """
+    Write the sidecar of the appliance `stats`, with a readable summary and
+    the feature normalization they imply.
+    """
+    sidecar = {
+        "feature_normalization": feature_normalization(stats.values(), percentile),
+        "normalization_percentile": percentile,
+        "summary": {ap: part.summary() for ap, part in stats.items()},
+        "state": {ap: part.to_dict() for ap, part in stats.items()},
+    }
+    with Path(path).open("w") as f:
+        json.dump(sidecar, f, indent=2)
+
+
+def load_stats(path: Path) -> Dict[str, ChannelStats]:
+    with Path(path).open() as f:
+        sidecar = json.load(f)
+    return {ap: ChannelStats.from_dict(s) for ap, s in sidecar["state"].items()}
+
+
+def emit_config(template: Path, out_path: Path, normalization: Sequence[float]) -> None:
+    """
+    Copy the config.json `template` to `out_path` with `normalization` as its
+    feature_normalization.
+    """
+    with Path(template).open() as f:
+        config = json.load(f)
+    config["_comment"] = (
+        f"Generated from {Path(template).name}; feature_normalization computed "
+        "from the training data statistics."
+    )
+    config["feature_normalization"] = list(normalization)
+    with Path(out_path).open("w") as f:
+        json.dump(config, f, indent=4)
@@ -0,0 +1,493 @@
+"""
+Storage backends for aggregated appliance arrays.
+
+Formats:
+  * pickle (default): the whole array pickled into the `.dat` file, as
+    expected by the external training toolkit.
+  * npy: a NumPy `.npy` file (small header + raw rows) that readers open as a
+    memory map, paging in only the rows they touch.
+  * compact: float32 power columns only. The timestamp channel, which repeats
+    the same value twice and advances by a fixed step, is stored as a short
+    list of (row, timestamp) segment starts in a JSON header.
+  * chunked: the full array cut into chunks of one training window
+    (`sample_size` rows), each compressed on its own with zlib or lzma. A
+    JSON footer holds the byte offset of every chunk, so any window can be
+    read by decompressing only its chunk.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import json
+import lzma
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import zlib
+import numpy as np
+
+try:
+    from constants import SAMPLE_SIZE, TIME_STEP
+except ModuleNotFoundError:  # imported as utils.storage, from the repo root
+    from utils.constants import SAMPLE_SIZE, TIME_STEP
+
+STORAGE_FORMATS = ("pickle", "npy", "compact", "chunked")
+
+FORMAT_SUFFIXES = {
+    "pickle": ".dat",
+    "npy": ".npy",
+    "compact": ".cdat",
+    "chunked": ".zdat",
+}
+
+COMPACT_MAGIC = b"WNCOMPACT\x01"
+COMPACT_ALIGN = 64
+
+CHUNKED_MAGIC = b"WNCHUNKED\x01"
+
+# Rows per chunk: one training window
+CHUNK_ROWS = SAMPLE_SIZE
+
+# (compress, decompress) of each codec usable by the chunked format
+CHUNK_CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def _row_index(selector, n_rows: int) -> np.ndarray:
+    """
+    Row numbers picked by `selector` (a slice, an integer, an integer array or
+    a boolean mask) out of `n_rows` rows, with negative integers wrapped.
+    """
+    if isinstance(selector, slice):
+        return np.arange(*selector.indices(n_rows))
+    rows = np.asarray(selector)
+    if rows.dtype == np.bool_:
+        if rows.shape != (n_rows,):
+            raise IndexError(
+                f"boolean index of shape {rows.shape} does not match {n_rows} rows"
+            )
+        return np.flatnonzero(rows)
+    if not np.issubdtype(rows.dtype, np.integer):
+        raise IndexError(f"rows cannot be indexed with {rows.dtype} values")
+    rows = np.where(rows < 0, rows + n_rows, rows)
+    if rows.size and (rows.min() < 0 or rows.max() >= n_rows):
+        raise IndexError(f"row index out of bounds for {n_rows} rows")
+    return rows
+
+
+class CompactArray:
+    """
+    Read-only (rows, channels, 2) float64 view of a compact file. Power
+    columns stay memory-mapped as float32; rows of the legacy layout, with
+    their timestamps, are rebuilt only for the rows that are indexed.
+    """
+
+    def __init__(self, power: np.ndarray, segments: np.ndarray, step: float):
+        self.power = power
+        self._segment_rows = segments[:, 0].astype(np.int64)
+        self._segment_starts = segments[:, 1]
+        self._step = step
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (len(self.power), self.power.shape[1] + 1, 2)
+
+    def __len__(self) -> int:
+        return len(self.power)
+
+    def timestamps(self, rows: np.ndarray) -> np.ndarray:
+        segment = np.searchsorted(self._segment_rows, rows, side="right") - 1
+        offset = rows - self._segment_rows[segment]
+        return self._segment_starts[segment] + self._step * offset
+
+    def _legacy(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty((len(rows),) + self.shape[1:])
+        out[:, 0, :] = self.timestamps(rows)[:, np.newaxis]
+        out[:, 1:] = self.power[rows]
+        return out
+
+    def __getitem__(self, key) -> Union[np.ndarray, np.floating]:
+        if not isinstance(key, tuple):
+            key = (key,)
+        selector, rest = key[0], key[1:]
+        rows = _row_index(selector, len(self))
+        if np.ndim(rows) == 0:
+            return self._legacy(np.atleast_1d(rows))[0][rest]
+        return self._legacy(rows)[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        legacy = self[:]
+        return legacy if dtype is None else legacy.astype(dtype)
+
+
+def _timestamp_segments(timestamps: np.ndarray, step: float) -> np.ndarray:
+    """
+    (row, timestamp) pairs starting each run of rows spaced exactly `step` apart.
+    """
+    breaks = np.flatnonzero(np.diff(timestamps) != step) + 1
+    rows = np.concatenate(([0], breaks)) if len(timestamps) else breaks
+    return np.stack((rows, timestamps[rows]), axis=1)
+
+
+def save_compact(path: Path, data: np.ndarray, step: float = TIME_STEP) -> None:
+    if not np.array_equal(data[:, 0, 0], data[:, 0, 1]):
+        raise ValueError("compact format requires identical timestamp columns.")
+    power = np.ascontiguousarray(data[:, 1:], dtype=np.float32)
+    header = {
+        "dtype": power.dtype.str,
+        "shape": power.shape,
+        "step": step,
+        "segments": _timestamp_segments(data[:, 0, 0], step).tolist(),
+    }
+    meta = json.dumps(header).encode()
+    prefix = len(COMPACT_MAGIC) + 4 + len(meta)
+    padding = -prefix % COMPACT_ALIGN
+    with path.open("wb") as f:
+        f.write(COMPACT_MAGIC + struct.pack("<I", len(meta) + padding))
+        f.write(meta + b" " * padding)
+        power.tofile(f)
+
+
+def load_compact(path: Path) -> CompactArray:
+    with path.open("rb") as f:
+        if f.read(len(COMPACT_MAGIC)) != COMPACT_MAGIC:
+            raise ValueError(f"'{path}' is not a compact file.")
+        (meta_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(meta_len))
+    power = np.memmap(
+        path,
+        dtype=np.dtype(header["dtype"]),
+        mode="r",
+        offset=len(COMPACT_MAGIC) + 4 + meta_len,
+        shape=tuple(header["shape"]),
+    )
+    segments = np.array(header["segments"], dtype=np.float64).reshape(-1, 2)
+    return CompactArray(power, segments, header["step"])
+
+
+class ChunkedArray:
+    """
+    Read-only view of a chunked file. Chunks are decompressed on access and
+    the last one is kept, so `window(i)` costs one chunk decompression and
+    sequential reads decompress every chunk once.
+    """
+
+    def __init__(self, path: Path, header: Dict):
+        with path.open("rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._dtype = np.dtype(header["dtype"])
+        self._shape = tuple(header["shape"])
+        self._chunk_rows = header["chunk_rows"]
+        self._offsets = header["offsets"]
+        self._decompress = CHUNK_CODECS[header["codec"]][1]
+        self._cached: Tuple[int, Optional[np.ndarray]] = (-1, None)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    @property
+    def chunk_rows(self) -> int:
+        return self._chunk_rows
+
+    @property
+    def n_windows(self) -> int:
+        return len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self._shape[0]
+
+    def window(self, i: int) -> np.ndarray:
+        """
+        Rows `i * chunk_rows` to `(i + 1) * chunk_rows` (chunk `i`).
+        """
+        index, chunk = self._cached
+        if index == i:
+            return chunk
+        raw = self._decompress(self._buffer[self._offsets[i] : self._offsets[i + 1]])
+        chunk = _unshuffle(raw, self._dtype).reshape((-1,) + self._shape[1:])
+        self._cached = (i, chunk)
+        return chunk
+
+    def _rows(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty((len(rows),) + self._shape[1:], dtype=self._dtype)
+        chunks = rows // self._chunk_rows
+        order = np.argsort(chunks, kind="stable")
+        first, starts = np.unique(chunks[order], return_index=True)
+        ends = np.append(starts[1:], len(rows))
+        for i, start, end in zip(first, starts, ends):
+            picked = order[start:end]
+            out[picked] = self.window(i)[rows[picked] - i * self._chunk_rows]
+        return out
+
+    def __getitem__(self, key) -> Union[np.ndarray, np.floating]:
+        if not isinstance(key, tuple):
+            key = (key,)
+        selector, rest = key[0], key[1:]
+        rows = _row_index(selector, len(self))
+        if np.ndim(rows) == 0:
+            return self._rows(np.atleast_1d(rows))[0][rest]
+        return self._rows(rows)[(slice(None),) + rest]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        out = np.empty(self._shape, dtype=self._dtype)
+        for i in range(self.n_windows):
+            out[i * self._chunk_rows : (i + 1) * self._chunk_rows] = self.window(i)
+        return out if dtype is None else out.astype(dtype)
+
+
+def _shuffle(chunk: np.ndarray) -> bytes:
+    """
+    Bytes of `chunk` grouped by byte position within each value (byte 0 of
+    every value, then byte 1, ...), which makes float data compress far better.
+    """
+    raw = np.frombuffer(chunk.tobytes(), dtype=np.uint8)
+    return raw.reshape(-1, chunk.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(raw: bytes, dtype: np.dtype) -> np.ndarray:
+    planes = np.frombuffer(raw, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def _write_chunks(f, data: np.ndarray, footer: Dict) -> int:
+    """
+    Write `data` as compressed chunks at the current position of `f`, which
+    must be `footer["offsets"][-1]`, adding their end offsets to the footer.
+    Returns the bytes written.
+    """
+    compress = CHUNK_CODECS[footer["codec"]][0]
+    dtype, chunk_rows = np.dtype(footer["dtype"]), footer["chunk_rows"]
+    offsets = footer["offsets"]
+    start_offset = offsets[-1]
+    for start in range(0, len(data), chunk_rows):
+        chunk = np.ascontiguousarray(data[start : start + chunk_rows], dtype=dtype)
+        offsets.append(offsets[-1] + f.write(compress(_shuffle(chunk))))
+    return offsets[-1] - start_offset
+
+
+def _write_footer(f, footer: Dict) -> None:
+    meta = json.dumps(footer).encode()
+    f.write(meta + struct.pack("<Q", len(meta)))
+
+
+class ChunkedWriter:
+    """
+    Chunked file written block of rows by block of rows. Full chunks are
+    compressed as the rows come and the rows of a partial one are kept until
+    the next block; offsets stay in memory and the footer is written once, by
+    `close`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        row_shape: Tuple[int, ...],
+        dtype: np.dtype = np.float64,
+        chunk_rows: int = CHUNK_ROWS,
+        codec: str = "zlib",
+    ):
+        self._footer = {
+            "dtype": np.dtype(dtype).str,
+            "shape": (0,) + tuple(row_shape),
+            "chunk_rows": chunk_rows,
+            "codec": codec,
+            "offsets": [len(CHUNKED_MAGIC)],
+        }
+        self._tail = np.empty((0,) + tuple(row_shape), dtype=dtype)
+        self._file = path.open("wb")
+        self._file.write(CHUNKED_MAGIC)
+
+    def write(self, rows: np.ndarray) -> int:
+        """
+        Add `rows` to the file. Returns the compressed bytes written.
+        """
+        footer = self._footer
+        chunk_rows = footer["chunk_rows"]
+        footer["shape"] = (footer["shape"][0] + len(rows),) + footer["shape"][1:]
+        written = 0
+        if len(self._tail):
+            take = chunk_rows - len(self._tail)
+            self._tail = np.concatenate((self._tail, rows[:take]))
+            rows = rows[take:]
+            if len(self._tail) < chunk_rows:
+                return 0
+            written += _write_chunks(self._file, self._tail, footer)
+            self._tail = self._tail[:0]
+        full = len(rows) - len(rows) % chunk_rows
+        written += _write_chunks(self._file, rows[:full], footer)
+        self._tail = np.array(rows[full:], dtype=self._tail.dtype)
+        return written
+
+    def close(self) -> None:
+        """
+        Write the partial last chunk, if any, and the footer.
+        """
+        if self._file.closed:
+            return
+        _write_chunks(self._file, self._tail, self._footer)
+        _write_footer(self._file, self._footer)
+        self._file.close()
+
+    def __enter__(self) -> "ChunkedWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def save_chunked(
+    path: Path, data: np.ndarray, chunk_rows: int = CHUNK_ROWS, codec: str = "zlib"
+) -> None:
+    dtype = np.dtype(getattr(data, "dtype", np.float64))
+    with ChunkedWriter(path, data.shape[1:], dtype, chunk_rows, codec) as writer:
+        writer.write(data)
+
+
+def _read_footer(f) -> Dict:
+    f.seek(-8, 2)
+    (meta_len,) = struct.unpack("<Q", f.read(8))
+    f.seek(-8 - meta_len, 2)
+    return json.loads(f.read(meta_len))
+
+
+def load_chunked(path: Path) -> ChunkedArray:
+    with path.open("rb") as f:
+        if f.read(len(CHUNKED_MAGIC)) != CHUNKED_MAGIC:
+            raise ValueError(f"'{path}' is not a chunked file.")
+        header = _read_footer(f)
+    return ChunkedArray(path, header)
+
+
+def _append_chunked(path: Path, rows: np.ndarray) -> None:
+    """
+    Re-compress the last chunk, if partial, together with `rows` and write a
+    new footer. Earlier chunks are left untouched.
+    """
+    with path.open("r+b") as f:
+        footer = _read_footer(f)
+        chunk_rows, offsets = footer["chunk_rows"], footer["offsets"]
+        full = footer["shape"][0] // chunk_rows
+        tail = np.empty((0,) + tuple(footer["shape"][1:]), dtype=footer["dtype"])
+        if full < len(offsets) - 1:
+            f.seek(offsets[full])
+            raw = CHUNK_CODECS[footer["codec"]][1](
+                f.read(offsets[full + 1] - offsets[full])
+            )
+            tail = _unshuffle(raw, tail.dtype).reshape((-1,) + tail.shape[1:])
+        footer["offsets"] = offsets[: full + 1]
+        footer["shape"] = [footer["shape"][0] + len(rows)] + footer["shape"][1:]
+        f.seek(offsets[full])
+        f.truncate()
+        _write_chunks(f, np.concatenate((tail, rows)), footer)
+        _write_footer(f, footer)
+
+
+def _append_npy(path: Path, rows: np.ndarray) -> bool:
+    """
+    Grow the shape in the header of `path` in place and write `rows` at the
+    end. False if the header has no room left for the new shape.
+    """
+    fmt = np.lib.format
+    with path.open("r+b") as f:
+        version = fmt.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = fmt.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = fmt.read_array_header_2_0(f)
+        if fortran_order or dtype != rows.dtype or shape[1:] != rows.shape[1:]:
+            raise ValueError(f"Cannot append {rows.shape} rows to '{path}'.")
+        header_start = fmt.MAGIC_LEN + (2 if version == (1, 0) else 4)
+        header_len = f.tell() - header_start
+        header = repr(
+            {
+                "descr": fmt.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (shape[0] + len(rows),) + shape[1:],
+            }
+        )
+        if len(header) >= header_len:
+            return False
+        f.seek(header_start)
+        f.write((header.ljust(header_len - 1) + "\n").encode("latin1"))
+        f.seek(0, 2)
+        f.write(np.ascontiguousarray(rows).tobytes())
+    return True
+
+
+def append_array(
+    path: Path, rows: np.ndarray, fmt: str = "pickle", codec: str = "zlib"
+) -> None:
+    """
+    Append `rows` to the array saved in `path`. npy and chunked files are
+    extended in place; pickle and compact files are loaded and rewritten.
+    Files hard-linked elsewhere (e.g. by the output cache) are copied first
+    so that the other links keep their content.
+    """
+    if os.stat(path).st_nlink > 1:
+        unshared = path.with_name(f".{path.name}.{os.getpid()}")
+        shutil.copy2(path, unshared)
+        os.replace(unshared, path)
+    if fmt == "npy" and _append_npy(path, rows):
+        return
+    if fmt == "chunked":
+        _append_chunked(path, rows)
+        return
+    data = np.concatenate((np.asarray(load_array(path, mmap=False)), rows))
+    path.unlink()
+    save_array(path, data, fmt, codec)
+
+
+def format_path(path: Path, fmt: str) -> Path:
+    """
+    Return `path` with the file suffix used by storage format `fmt`.
+    """
+    return path.with_suffix(FORMAT_SUFFIXES[fmt])
+
+
+def save_array(
+    path: Path, data: np.ndarray, fmt: str = "pickle", codec: str = "zlib"
+) -> None:
+    """
+    Write `data` to `path` in storage format `fmt`. `codec` is only used by
+    the chunked format.
+    """
+    if fmt == "pickle":
+        with path.open("wb") as f:
+            pickle.dump(data, f)
+    elif fmt == "npy":
+        np.save(path, data, allow_pickle=False)
+    elif fmt == "compact":
+        save_compact(path, data)
+    elif fmt == "chunked":
+        save_chunked(path, data, codec=codec)
+    else:
+        raise ValueError(f"Unknown storage format '{fmt}'.")
+
+
+def load_array(
+    path: Path, mmap: bool = True
+) -> Union[np.ndarray, CompactArray, ChunkedArray]:
+    """
+    Load an array written by `save_array`, choosing the backend by suffix.
+    `.npy` files are opened as a read-only `np.memmap` unless `mmap` is False;
+    compact and chunked files are returned as a `CompactArray` and a
+    `ChunkedArray`.
+    """
+    path = Path(path)
+    if path.suffix == FORMAT_SUFFIXES["compact"]:
+        return load_compact(path)
+    if path.suffix == FORMAT_SUFFIXES["chunked"]:
+        return load_chunked(path)
+    if path.suffix == FORMAT_SUFFIXES["npy"]:
+        return np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+    with path.open("rb") as f:
+        return pickle.load(f)
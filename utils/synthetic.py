@@ -0,0 +1,150 @@
+"""
+Synthetic appliance signal generator.
+
+Each appliance alternates between off and on periods whose durations (in
+minutes) follow gamma distributions, and draws one active/reactive power
+level per activation. The aggregate channel adds a noisy background load on
+top of the appliance. Output follows the layout of the files under
+data/casa_simulada/: (rows, 3, 2) with timestamps, aggregate and appliance
+channels, one row per minute.
+
+Work is split into fixed-size tasks, each with its own RNG stream spawned
+from a single seed, so the result only depends on the seed and not on how
+many worker processes ran the tasks.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MINUTES_PER_DAY = 1440
+
+# Durations are (mean minutes, gamma shape); power levels of each activation
+# and the per-minute noise added on top are (mean W, std W)
+APPLIANCE_PROFILES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "ar_condicionado": {
+        "on_minutes": (120.0, 2.0),
+        "off_minutes": (360.0, 1.5),
+        "active_power": (1400.0, 250.0),
+        "reactive_power": (450.0, 80.0),
+        "noise": (0.0, 30.0),
+    },
+    "chuveiro": {
+        "on_minutes": (10.0, 3.0),
+        "off_minutes": (720.0, 1.2),
+        "active_power": (5500.0, 500.0),
+        "reactive_power": (50.0, 20.0),
+        "noise": (0.0, 50.0),
+    },
+    "refrigerador": {
+        "on_minutes": (25.0, 6.0),
+        "off_minutes": (35.0, 6.0),
+        "active_power": (130.0, 15.0),
+        "reactive_power": (90.0, 10.0),
+        "noise": (0.0, 5.0),
+    },
+}
+
+BACKGROUND_PROFILE: Dict[str, Tuple[float, float]] = {
+    "active_power": (300.0, 80.0),
+    "reactive_power": (120.0, 40.0),
+}
+
+DAYS_PER_TASK = 7
+
+
+def _durations(
+    rng: np.random.Generator, mean_shape: Tuple[float, float], size: int
+) -> np.ndarray:
+    mean, shape = mean_shape
+    durations = rng.gamma(shape, mean / shape, size)
+    return np.maximum(1, np.rint(durations)).astype(np.int64)
+
+
+def _activations(
+    rng: np.random.Generator, profile: Dict[str, Tuple[float, float]], n_rows: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end rows of the activations covering `n_rows` minutes.
+    """
+    cycle = profile["on_minutes"][0] + profile["off_minutes"][0]
+    n_cycles = int(np.ceil(n_rows / cycle)) + 8
+    phase = -int(rng.integers(0, int(cycle)))
+    while True:
+        on = _durations(rng, profile["on_minutes"], n_cycles)
+        off = _durations(rng, profile["off_minutes"], n_cycles)
+        ends = phase + np.cumsum(off + on)
+        if ends[-1] >= n_rows:
+            break
+        n_cycles *= 2
+    return ends - on, ends
+
+
+def generate_rows(
+    appliance: str, n_rows: int, seed: np.random.SeedSequence
+) -> np.ndarray:
+    """
+    `n_rows` minutes of synthetic `appliance` data, shaped (n_rows, 3, 2).
+    The timestamp channel is left at zero; it is set during aggregation.
+    """
+    profile = APPLIANCE_PROFILES[appliance]
+    rng = np.random.default_rng(seed)
+    starts, ends = _activations(rng, profile, n_rows)
+
+    rows = np.arange(n_rows)
+    event = np.searchsorted(starts, rows, side="right") - 1
+    active = (event >= 0) & (rows < ends[np.maximum(event, 0)])
+
+    levels = np.stack(
+        [
+            rng.normal(*profile["active_power"], len(starts)),
+            rng.normal(*profile["reactive_power"], len(starts)),
+        ],
+        axis=1,
+    )
+    noise = rng.normal(*profile["noise"], (n_rows, 2))
+    appliance_power = np.where(
+        active[:, np.newaxis], levels[np.maximum(event, 0)] + noise, 0.0
+    )
+    background = np.stack(
+        [
+            rng.normal(*BACKGROUND_PROFILE["active_power"], n_rows),
+            rng.normal(*BACKGROUND_PROFILE["reactive_power"], n_rows),
+        ],
+        axis=1,
+    )
+
+    out = np.zeros((n_rows, 3, 2))
+    out[:, 2] = np.maximum(appliance_power, 0)
+    out[:, 1] = out[:, 2] + np.maximum(background, 0)
+    return out
+
+
+def _generate_task(task: Tuple[str, int, np.random.SeedSequence]) -> np.ndarray:
+    return generate_rows(*task)
+
+
+def generate_appliance(
+    appliance: str, n_days: int, seed: int = 0, workers: int = 1
+) -> np.ndarray:
+    """
+    `n_days` of synthetic `appliance` data, generated in tasks of
+    `DAYS_PER_TASK` days spread over `workers` processes.
+    """
+    task_days = [
+        min(DAYS_PER_TASK, n_days - day) for day in range(0, n_days, DAYS_PER_TASK)
+    ]
+    seeds = np.random.SeedSequence([seed, list(APPLIANCE_PROFILES).index(appliance)])
+    tasks = [
+        (appliance, days * MINUTES_PER_DAY, task_seed)
+        for days, task_seed in zip(task_days, seeds.spawn(len(task_days)))
+    ]
+    if workers <= 1:
+        parts: List[np.ndarray] = [_generate_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_generate_task, tasks))
+    if not parts:
+        return np.zeros((0, 3, 2))
+    return np.concatenate(parts, axis=0)
@@ -0,0 +1,100 @@
+"""
+Signal transforms for augmentation of (rows, channels, 2) house chunks.
+
+Every transform is a generator stage that takes an iterator of chunks and
+yields transformed chunks, so any number of them can be chained over a
+stream of chunks while only one chunk is held in memory. Transforms operate
+on whole chunks with NumPy; the timestamp channel (0) is left untouched and
+expected to be rewritten by the caller. Channel 1 is the aggregate, the
+other power channels are appliances.
+"""
+
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+def iter_chunks(data: np.ndarray, chunk_rows: int) -> Iterator[np.ndarray]:
+    """
+    Copies of consecutive `chunk_rows` slices of `data`, safe to modify.
+    """
+    for start in range(0, len(data), chunk_rows):
+        yield np.array(data[start : start + chunk_rows])
+
+
+def time_warp(
+    chunks: Iterator[np.ndarray], rng: np.random.Generator, spread: float
+) -> Iterator[np.ndarray]:
+    """
+    Stretch or compress every chunk in time by a factor drawn uniformly from
+    [1 - spread, 1 + spread], interpolating all channels linearly.
+    """
+    for chunk in chunks:
+        if len(chunk) < 2:
+            yield chunk
+            continue
+        n_rows = max(2, int(round(len(chunk) * rng.uniform(1 - spread, 1 + spread))))
+        position = np.linspace(0, len(chunk) - 1, n_rows)
+        below = np.minimum(position.astype(np.int64), len(chunk) - 2)
+        weight = (position - below)[:, np.newaxis, np.newaxis]
+        yield chunk[below] * (1 - weight) + chunk[below + 1] * weight
+
+
+def scale(
+    chunks: Iterator[np.ndarray], rng: np.random.Generator, spread: float
+) -> Iterator[np.ndarray]:
+    """
+    Multiply the aggregate and appliance channels of every chunk by one
+    factor drawn uniformly from [1 - spread, 1 + spread].
+    """
+    for chunk in chunks:
+        chunk[:, 1:] *= rng.uniform(1 - spread, 1 + spread)
+        yield chunk
+
+
+def add_noise(
+    chunks: Iterator[np.ndarray], rng: np.random.Generator, std: float
+) -> Iterator[np.ndarray]:
+    """
+    Add Gaussian noise of standard deviation `std` W to the aggregate channel.
+    """
+    for chunk in chunks:
+        chunk[:, 1] += rng.normal(0.0, std, chunk[:, 1].shape)
+        yield chunk
+
+
+def clip(
+    chunks: Iterator[np.ndarray], max_power: Optional[float]
+) -> Iterator[np.ndarray]:
+    """
+    Clip the active power of all power channels at 0 W, as noise can push it
+    below, and their active and reactive power at `max_power` W if it is not
+    None. Reactive power is signed and keeps its negative values.
+    """
+    for chunk in chunks:
+        active = chunk[:, 1:, 0]
+        np.maximum(active, 0.0, out=active)
+        if max_power is not None:
+            np.minimum(chunk[:, 1:], max_power, out=chunk[:, 1:])
+        yield chunk
+
+
+def transform_chunks(
+    chunks: Iterator[np.ndarray],
+    rng: np.random.Generator,
+    noise_std: float = 0.0,
+    scale_spread: float = 0.0,
+    warp_spread: float = 0.0,
+    max_power: Optional[float] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Chain time warping, scaling, noise and clipping over `chunks`, skipping
+    the transforms whose parameter is zero.
+    """
+    if warp_spread:
+        chunks = time_warp(chunks, rng, warp_spread)
+    if scale_spread:
+        chunks = scale(chunks, rng, scale_spread)
+    if noise_std:
+        chunks = add_noise(chunks, rng, noise_std)
+    return clip(chunks, max_power)
@@ -0,0 +1,94 @@
+"""
+Pre-windowed training tensors.
+
+Turns an aggregated (rows, 3, 2) appliance array into a contiguous float32
+(n_windows, sample_size, 4) `.npy` file holding the aggregate and appliance
+active/reactive power of every window, already divided by the
+`feature_normalization` of the trainer's config.json. Windows start every
+`stride` rows. A JSON manifest next to the tensor records how it was built,
+so the trainer can memory-map it and read batches without reshaping.
+"""
+
+from pathlib import Path
+from typing import Dict, Sequence
+
+import json
+import numpy as np
+
+WINDOW_CHANNELS = (
+    "aggregate_active",
+    "aggregate_reactive",
+    "appliance_active",
+    "appliance_reactive",
+)
+
+# Windows converted per chunk, bounding the memory used by the export
+EXPORT_CHUNK_WINDOWS = 256
+
+
+def load_window_config(path: Path) -> Dict:
+    """
+    `sample_size`, `depth` and `feature_normalization` of a conf/config*.json.
+    """
+    with Path(path).open() as f:
+        config = json.load(f)
+    return {
+        "sample_size": int(config["sample_size"]),
+        "depth": int(config["depth"]),
+        "feature_normalization": [float(v) for v in config["feature_normalization"]],
+    }
+
+
+def window_count(n_rows: int, sample_size: int, stride: int) -> int:
+    if n_rows < sample_size:
+        return 0
+    return (n_rows - sample_size) // stride + 1
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def export_windows(
+    data: np.ndarray,
+    out_path: Path,
+    sample_size: int,
+    stride: int,
+    feature_normalization: Sequence[float],
+    **manifest,
+) -> np.ndarray:
+    """
+    Write the windows of `data` to `out_path` and its manifest next to it.
+    `data` may be any array-like returned by `load_array`; it is read
+    `EXPORT_CHUNK_WINDOWS` windows at a time. Extra keyword arguments are
+    stored in the manifest.
+    """
+    n_windows = window_count(len(data), sample_size, stride)
+    scale = 1.0 / np.tile(np.asarray(feature_normalization, dtype=np.float64), 2)
+    out = np.lib.format.open_memmap(
+        out_path,
+        mode="w+",
+        dtype=np.float32,
+        shape=(n_windows, sample_size, len(WINDOW_CHANNELS)),
+    )
+    for first in range(0, n_windows, EXPORT_CHUNK_WINDOWS):
+        last = min(first + EXPORT_CHUNK_WINDOWS, n_windows)
+        rows = np.asarray(data[first * stride : (last - 1) * stride + sample_size])
+        power = rows[:, 1:3, :].reshape(len(rows), len(WINDOW_CHANNELS)) * scale
+        windows = np.lib.stride_tricks.sliding_window_view(power, sample_size, axis=0)
+        out[first:last] = windows[::stride].transpose(0, 2, 1)
+    out.flush()
+
+    manifest = {
+        "file": out_path.name,
+        "shape": list(out.shape),
+        "dtype": out.dtype.str,
+        "sample_size": sample_size,
+        "stride": stride,
+        "channels": list(WINDOW_CHANNELS),
+        "feature_normalization": list(feature_normalization),
+        **manifest,
+    }
+    with manifest_path(out_path).open("w") as f:
+        json.dump(manifest, f, indent=2)
+    return out